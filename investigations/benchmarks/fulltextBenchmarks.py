@@ -0,0 +1,99 @@
+import os
+import random
+from lib.simpledb.schema import Schema
+from lib.visualization.plots import PlotBuilder
+from lib.utils.timing import measureExecutionTime
+from investigations.benchmarks.simpledbBenchmarks import clearDataDir, createEngine, BASE_TEMP_DIR, RANDOM_SEED_STRING
+
+TITLE_WORDS = [
+    "action", "drama", "story", "hero", "adventure", "journey", "love", "crime",
+    "detective", "night", "city", "dark", "secret", "last", "lost", "world",
+    "war", "family", "summer", "winter", "road", "river", "king", "game"
+]
+SINGLE_WORD_QUERIES = ['action', 'drama', 'story', 'hero', 'adventure']
+MULTI_WORD_QUERIES = ['action & hero', 'drama & story', 'adventure & journey', 'love & story', 'crime & detective']
+
+def createFulltextSchema(tableName, withIndex):
+    column = {"name": "title", "type": "VARCHAR", "max": 64}
+    if withIndex:
+        column["fulltext"] = True
+    return Schema(tableName, [{"name": "id", "type": "INT"}, column])
+
+def populateTitleTable(engine, rowCount, seedValue):
+    random.seed(seedValue)
+    rows = []
+    for i in range(1, rowCount + 1):
+        title = ' '.join(random.choice(TITLE_WORDS) for _ in range(random.randint(2, 5)))
+        rows.append({"id": i, "title": title})
+    engine.insertMany(rows)
+
+def measureMatchPerformance(engine, queries, queriesPerRun):
+    totalTime = 0
+
+    for queryIndex in range(queriesPerRun):
+        where = {'op': 'match', 'col': 'title', 'value': queries[queryIndex % len(queries)]}
+
+        def executeQuery():
+            return engine.select(['*'], where)
+
+        totalTime += measureExecutionTime(executeQuery)
+
+    return totalTime / queriesPerRun
+
+def runFulltextBenchmark(resultsDir, showPlots, rowCounts, repeats, queriesPerRun):
+    dataDir = os.path.join(BASE_TEMP_DIR, 'fulltext')
+    csvFile = 'simpledb_fulltext.csv'
+    plotFile = 'simpledb_fulltext'
+
+    clearDataDir(dataDir)
+
+    results = []
+
+    for rowCount in rowCounts:
+        print(f"SimpleDB полнотекстовый поиск: тестируем {rowCount} строк")
+
+        times = [[], [], [], []]
+
+        for repeat in range(repeats):
+            engineWithIndex = createEngine(dataDir, createFulltextSchema("test_fts", True))
+            engineWithoutIndex = createEngine(dataDir, createFulltextSchema("test_plain", False))
+
+            populateTitleTable(engineWithIndex, rowCount, RANDOM_SEED_STRING)
+            populateTitleTable(engineWithoutIndex, rowCount, RANDOM_SEED_STRING)
+
+            times[0].append(measureMatchPerformance(engineWithIndex, SINGLE_WORD_QUERIES, queriesPerRun))
+            times[1].append(measureMatchPerformance(engineWithoutIndex, SINGLE_WORD_QUERIES, queriesPerRun))
+            times[2].append(measureMatchPerformance(engineWithIndex, MULTI_WORD_QUERIES, queriesPerRun))
+            times[3].append(measureMatchPerformance(engineWithoutIndex, MULTI_WORD_QUERIES, queriesPerRun))
+
+            engineWithIndex.close()
+            engineWithoutIndex.close()
+
+        results.append([rowCount] + [sum(t) / len(t) for t in times])
+
+    csvPath = os.path.join(resultsDir, csvFile)
+    with open(csvPath, 'w', encoding='utf-8') as f:
+        f.write("row_count,single_with_index,single_without_index,multi_with_index,multi_without_index\n")
+        for row in results:
+            f.write(f"{row[0]},{row[1]},{row[2]},{row[3]},{row[4]}\n")
+
+    if showPlots:
+        builder = PlotBuilder(resultsDir)
+
+        xValues = [r[0] for r in results]
+
+        seriesData = {
+            'Одно слово, индекс': (xValues, [r[1] for r in results]),
+            'Одно слово, без индекса': (xValues, [r[2] for r in results]),
+            'Несколько слов, индекс': (xValues, [r[3] for r in results]),
+            'Несколько слов, без индекса': (xValues, [r[4] for r in results])
+        }
+
+        builder.buildChart(
+            seriesData,
+            "SimpleDB: полнотекстовый поиск (MATCH)",
+            "Количество строк",
+            "Время выполнения (сек)",
+            plotFile,
+            True
+        )
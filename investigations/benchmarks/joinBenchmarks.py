@@ -0,0 +1,94 @@
+import os
+import random
+from lib.simpledb import SimpleDatabase
+from lib.visualization.plots import PlotBuilder
+from lib.utils.timing import measureExecutionTime
+from investigations.benchmarks.simpledbBenchmarks import clearDataDir, BASE_TEMP_DIR, RANDOM_SEED_NUMBER
+
+FAVORITES_PER_VIEWER = 3
+VIEWERS_PER_MOVIE = 10
+JOIN_SQL = "SELECT v.viewer_id, m.title FROM viewer v JOIN favorite_movies fm ON v.viewer_id = fm.viewer_id JOIN movie m ON fm.movie_id = m.movie_id"
+COMPLEX_JOIN_SQL = "SELECT v.viewer_id, m.title, vp.nickname FROM viewer v JOIN viewer_profile vp ON v.viewer_id = vp.viewer_id JOIN favorite_movies fm ON v.viewer_id = fm.viewer_id JOIN movie m ON fm.movie_id = m.movie_id"
+SELECTIVE_JOIN_SQL = JOIN_SQL + " WHERE v.viewer_id <= 100"
+
+def createJoinTables(db, viewerCount, seedValue, withIndex):
+    random.seed(seedValue)
+    movieCount = viewerCount // VIEWERS_PER_MOVIE + 1
+    db.createTable('viewer', [{"name": "viewer_id", "type": "INT"}, {"name": "first_name", "type": "VARCHAR", "max": 32}])
+    db.createTable('viewer_profile', [{"name": "viewer_id", "type": "INT"}, {"name": "nickname", "type": "VARCHAR", "max": 32}])
+    db.createTable('favorite_movies', [{"name": "viewer_id", "type": "INT"}, {"name": "movie_id", "type": "INT"}])
+    db.createTable('movie', [{"name": "movie_id", "type": "INT"}, {"name": "title", "type": "VARCHAR", "max": 64}])
+    db.tables['viewer'].insertMany([{"viewer_id": i, "first_name": "Viewer" + str(i)} for i in range(1, viewerCount + 1)])
+    db.tables['viewer_profile'].insertMany([{"viewer_id": i, "nickname": "nick" + str(i)} for i in range(1, viewerCount + 1)])
+    favorites = []
+    for i in range(1, viewerCount + 1):
+        for j in range(FAVORITES_PER_VIEWER):
+            favorites.append({"viewer_id": i, "movie_id": random.randint(1, movieCount)})
+    db.tables['favorite_movies'].insertMany(favorites)
+    db.tables['movie'].insertMany([{"movie_id": i, "title": "Movie " + str(i)} for i in range(1, movieCount + 1)])
+    if withIndex:
+        db.createIndex('viewer_profile', 'viewer_id')
+        db.createIndex('favorite_movies', 'viewer_id')
+        db.createIndex('movie', 'movie_id')
+
+def runJoinBenchmark(resultsDir, showPlots, rowCounts, repeats):
+    dataDir = os.path.join(BASE_TEMP_DIR, 'join')
+    csvFile = 'simpledb_join.csv'
+    plotFile = 'simpledb_join'
+
+    clearDataDir(dataDir)
+
+    results = []
+
+    for rowCount in rowCounts:
+        print(f"SimpleDB JOIN: тестируем {rowCount} зрителей")
+
+        times = [[], [], [], [], [], []]
+
+        for repeat in range(repeats):
+            dbWithIndex = SimpleDatabase(os.path.join(dataDir, 'indexed'))
+            dbWithoutIndex = SimpleDatabase(os.path.join(dataDir, 'plain'))
+
+            createJoinTables(dbWithIndex, rowCount, RANDOM_SEED_NUMBER, True)
+            createJoinTables(dbWithoutIndex, rowCount, RANDOM_SEED_NUMBER, False)
+
+            times[0].append(measureExecutionTime(lambda: dbWithIndex.execute(JOIN_SQL)))
+            times[1].append(measureExecutionTime(lambda: dbWithoutIndex.execute(JOIN_SQL)))
+            times[2].append(measureExecutionTime(lambda: dbWithIndex.execute(COMPLEX_JOIN_SQL)))
+            times[3].append(measureExecutionTime(lambda: dbWithoutIndex.execute(COMPLEX_JOIN_SQL)))
+            times[4].append(measureExecutionTime(lambda: dbWithIndex.execute(SELECTIVE_JOIN_SQL)))
+            times[5].append(measureExecutionTime(lambda: dbWithoutIndex.execute(SELECTIVE_JOIN_SQL)))
+
+            dbWithIndex.closeAll()
+            dbWithoutIndex.closeAll()
+
+        results.append([rowCount] + [sum(t) / len(t) for t in times])
+
+    csvPath = os.path.join(resultsDir, csvFile)
+    with open(csvPath, 'w', encoding='utf-8') as f:
+        f.write("row_count,join_index_nested_loop,join_hash,complex_join_index_nested_loop,complex_join_hash,selective_join_index_nested_loop,selective_join_hash\n")
+        for row in results:
+            f.write(f"{row[0]},{row[1]},{row[2]},{row[3]},{row[4]},{row[5]},{row[6]}\n")
+
+    if showPlots:
+        builder = PlotBuilder(resultsDir)
+
+        xValues = [r[0] for r in results]
+
+        seriesData = {
+            'JOIN, вложенные циклы по индексу': (xValues, [r[1] for r in results]),
+            'JOIN, хеш-соединение': (xValues, [r[2] for r in results]),
+            'Сложный JOIN, вложенные циклы по индексу': (xValues, [r[3] for r in results]),
+            'Сложный JOIN, хеш-соединение': (xValues, [r[4] for r in results]),
+            'JOIN 100 зрителей, вложенные циклы по индексу': (xValues, [r[5] for r in results]),
+            'JOIN 100 зрителей, хеш-соединение': (xValues, [r[6] for r in results])
+        }
+
+        builder.buildChart(
+            seriesData,
+            "SimpleDB: JOIN viewer ⋈ favorite_movies ⋈ movie",
+            "Количество зрителей",
+            "Время выполнения (сек)",
+            plotFile,
+            True
+        )
@@ -0,0 +1,184 @@
+import os
+import random
+import struct
+from lib.simpledb.schema import Schema
+from lib.simpledb.rowcodec import unpackValue
+from lib.simpledb.predicates import compileMatcher
+from lib.visualization.plots import PlotBuilder
+from lib.utils.timing import measureExecutionTime
+from investigations.benchmarks.simpledbBenchmarks import clearDataDir, createEngine, BASE_TEMP_DIR, RANDOM_SEED_STRING
+
+ROWS_PER_MILLION = 1000000
+
+def createWideSchema(tableName):
+    return Schema(tableName, [
+        {"name": "id", "type": "INT"},
+        {"name": "name", "type": "VARCHAR", "max": 32},
+        {"name": "city", "type": "VARCHAR", "max": 32},
+        {"name": "age", "type": "INT"}
+    ])
+
+def populateWideTable(engine, rowCount, seedValue):
+    random.seed(seedValue)
+    names = ["Alice", "Bob", "Charlie", "Diana", "Edward", "Fiona", "George", "Helen"]
+    cities = ["Moscow", "Kazan", "Samara", "Omsk", "Tomsk"]
+    rows = []
+    for i in range(1, rowCount + 1):
+        rows.append({"id": i, "name": random.choice(names) + str(i), "city": random.choice(cities), "age": random.randint(18, 90)})
+    engine.insertMany(rows)
+
+def collectRowSlices(engine):
+    view = engine._getDataView()
+    slices = []
+    for rid in range(engine.rowCount()):
+        off = engine.rowOffsets[rid]
+        slices.append(view[off:off + engine.rowLengths[rid]])
+    return slices
+
+def decodeInterpreted(slices, types, colIndexes):
+    for data in slices:
+        res = []
+        for idx in colIndexes:
+            off = struct.unpack('<I', data[7 + idx * 4:11 + idx * 4])[0]
+            v, _ = unpackValue(types[idx], data, off)
+            res.append(v)
+
+def decodeCompiled(slices, decoder, colIndexes):
+    project = decoder.projection(colIndexes)
+    for data in slices:
+        project(data)
+
+def runRowDecodeBenchmark(resultsDir, showPlots, rowCounts, repeats):
+    dataDir = os.path.join(BASE_TEMP_DIR, 'row_decode')
+    csvFile = 'simpledb_row_decode.csv'
+    plotFile = 'simpledb_row_decode'
+
+    clearDataDir(dataDir)
+
+    results = []
+
+    for rowCount in rowCounts:
+        print(f"SimpleDB декодирование строк: тестируем {rowCount} строк")
+
+        engine = createEngine(dataDir, createWideSchema("test_decode"))
+        populateWideTable(engine, rowCount, RANDOM_SEED_STRING)
+        slices = collectRowSlices(engine)
+        schema = engine.schema
+        allColumns = list(range(len(schema.types)))
+
+        timesInterpreted = []
+        timesCompiled = []
+
+        for repeat in range(repeats):
+            timesInterpreted.append(measureExecutionTime(lambda: decodeInterpreted(slices, schema.types, allColumns)))
+            timesCompiled.append(measureExecutionTime(lambda: decodeCompiled(slices, schema.decoder, allColumns)))
+
+        scale = ROWS_PER_MILLION / rowCount
+        results.append([
+            rowCount,
+            sum(timesInterpreted) / len(timesInterpreted) * scale,
+            sum(timesCompiled) / len(timesCompiled) * scale
+        ])
+
+        del slices
+        engine.close()
+
+    csvPath = os.path.join(resultsDir, csvFile)
+    with open(csvPath, 'w', encoding='utf-8') as f:
+        f.write("row_count,interpreted_sec_per_million,compiled_sec_per_million\n")
+        for row in results:
+            f.write(f"{row[0]},{row[1]},{row[2]}\n")
+
+    if showPlots:
+        builder = PlotBuilder(resultsDir)
+
+        xValues = [r[0] for r in results]
+
+        seriesData = {
+            'unpackValue по колонкам': (xValues, [r[1] for r in results]),
+            'Скомпилированная проекция': (xValues, [r[2] for r in results])
+        }
+
+        builder.buildChart(
+            seriesData,
+            "SimpleDB: декодирование строк",
+            "Количество строк",
+            "Время на миллион строк (сек)",
+            plotFile,
+            True
+        )
+
+def countDecodedMatches(slices, decoder, colIdx, test):
+    project = decoder.projection([colIdx])
+    n = 0
+    for data in slices:
+        if test(project(data)[0]):
+            n += 1
+    return n
+
+def countCompiledMatches(slices, matches):
+    n = 0
+    for data in slices:
+        if matches(data):
+            n += 1
+    return n
+
+def runPredicateEvalBenchmark(resultsDir, showPlots, rowCounts, repeats):
+    dataDir = os.path.join(BASE_TEMP_DIR, 'predicate_eval')
+    csvFile = 'simpledb_predicate_eval.csv'
+    plotFile = 'simpledb_predicate_eval'
+
+    clearDataDir(dataDir)
+
+    results = []
+
+    for rowCount in rowCounts:
+        print(f"SimpleDB вычисление условий WHERE: тестируем {rowCount} строк")
+
+        engine = createEngine(dataDir, createWideSchema("test_predicate"))
+        populateWideTable(engine, rowCount, RANDOM_SEED_STRING)
+        slices = collectRowSlices(engine)
+        schema = engine.schema
+        cityMatcher = compileMatcher({'op': '=', 'col': 'city', 'value': 'Kazan'}, schema)
+        ageMatcher = compileMatcher({'op': '<', 'col': 'age', 'value': 30}, schema)
+
+        times = [[], [], [], []]
+
+        for repeat in range(repeats):
+            times[0].append(measureExecutionTime(lambda: countDecodedMatches(slices, schema.decoder, 2, lambda v: v == 'Kazan')))
+            times[1].append(measureExecutionTime(lambda: countCompiledMatches(slices, cityMatcher)))
+            times[2].append(measureExecutionTime(lambda: countDecodedMatches(slices, schema.decoder, 3, lambda v: v < 30)))
+            times[3].append(measureExecutionTime(lambda: countCompiledMatches(slices, ageMatcher)))
+
+        scale = ROWS_PER_MILLION / rowCount
+        results.append([rowCount] + [sum(t) / len(t) * scale for t in times])
+
+        del slices
+        engine.close()
+
+    csvPath = os.path.join(resultsDir, csvFile)
+    with open(csvPath, 'w', encoding='utf-8') as f:
+        f.write("row_count,varchar_eq_decoded,varchar_eq_bytes,int_lt_decoded,int_lt_single_entry\n")
+        for row in results:
+            f.write(f"{row[0]},{row[1]},{row[2]},{row[3]},{row[4]}\n")
+
+    if showPlots:
+        builder = PlotBuilder(resultsDir)
+
+        xValues = [r[0] for r in results]
+
+        seriesData = {
+            'VARCHAR =, декодирование': (xValues, [r[1] for r in results]),
+            'VARCHAR =, сравнение байтов': (xValues, [r[2] for r in results]),
+            'INT <, декодирование': (xValues, [r[3] for r in results]),
+            'INT <, чтение одной колонки': (xValues, [r[4] for r in results])
+        }
+
+        builder.buildChart(
+            seriesData,
+            "SimpleDB: вычисление условий WHERE",
+            "Количество строк",
+            "Время на миллион строк (сек)",
+            plotFile,
+            True
+        )
@@ -41,24 +41,47 @@ def createSchema(tableName, dataType, withIndex):
                 {"name": "name", "type": "VARCHAR", "max": 32}
             ])
 
-def createEngine(dataDir, schema):
+def createEngine(dataDir, schema, writeBufferSize=None):
     files = TableFiles(dataDir, schema.tableName)
-    eng = TableEngine(files, schema)
+    if writeBufferSize is None:
+        eng = TableEngine(files, schema)
+    else:
+        eng = TableEngine(files, schema, writeBufferSize)
     eng.create()
     eng.open()
     return eng
 
-def populateNumberTable(engine, rowCount, seedValue):
+def generateNumberRows(rowCount, seedValue):
     random.seed(seedValue)
-    for i in range(1, rowCount + 1):
-        engine.insertRow({"id": i, "val": random.randint(0, 1000000)})
+    return [{"id": i, "val": random.randint(0, 1000000)} for i in range(1, rowCount + 1)]
+
+def populateNumberTable(engine, rowCount, seedValue):
+    engine.insertMany(generateNumberRows(rowCount, seedValue))
+
+def populateNumberTableRowByRow(engine, rowCount, seedValue):
+    for row in generateNumberRows(rowCount, seedValue):
+        engine.insertRow(row)
+
+def populateNumberTableReopening(engine, rowCount, seedValue):
+    for row in generateNumberRows(rowCount, seedValue):
+        engine.insertRow(row)
+        engine._closeDataFile()
+
+def scanTableReopening(engine):
+    rows = []
+    for rowId in range(engine.rowCount()):
+        rows.append(engine.readRow(rowId))
+        engine._closeDataFile()
+    return rows
 
 def populateStringTable(engine, rowCount, seedValue):
     random.seed(seedValue)
     names = ["Alice", "Bob", "Charlie", "Diana", "Edward", "Fiona", "George", "Helen"]
+    rows = []
     for i in range(1, rowCount + 1):
         name = random.choice(names) + str(i % 100)
-        engine.insertRow({"id": i, "name": name})
+        rows.append({"id": i, "name": name})
+    engine.insertMany(rows)
 
 def buildIndex(engine, columnName):
     engine._rebuildSingleIndex(columnName)
@@ -351,6 +374,361 @@ def runDeleteBenchmark(dataType, resultsDir, showPlots, rowCounts, repeats, quer
             True
         )
 
+def runIoBufferBenchmark(resultsDir, showPlots, rowCounts, repeats):
+    dataDir = os.path.join(BASE_TEMP_DIR, 'io_buffer')
+    csvFile = 'simpledb_io_buffer.csv'
+    plotFile = 'simpledb_io_buffer'
+
+    clearDataDir(dataDir)
+
+    results = []
+
+    for rowCount in rowCounts:
+        print(f"SimpleDB I/O: тестируем {rowCount} строк (открытие файла на каждую запись, постоянный дескриптор, буфер записи)")
+
+        insertReopen = []
+        insertUnbuffered = []
+        insertBuffered = []
+        scanReopen = []
+        scanPersistent = []
+
+        for repeat in range(repeats):
+            engineReopen = createEngine(dataDir, createSchema("test_reopen", 'number', False), 0)
+            engineUnbuffered = createEngine(dataDir, createSchema("test_unbuffered", 'number', False), 0)
+            engineBuffered = createEngine(dataDir, createSchema("test_buffered", 'number', False))
+
+            insertReopen.append(measureExecutionTime(lambda: populateNumberTableReopening(engineReopen, rowCount, RANDOM_SEED_NUMBER)))
+            insertUnbuffered.append(measureExecutionTime(lambda: populateNumberTableRowByRow(engineUnbuffered, rowCount, RANDOM_SEED_NUMBER)))
+            insertBuffered.append(measureExecutionTime(lambda: populateNumberTableRowByRow(engineBuffered, rowCount, RANDOM_SEED_NUMBER)))
+
+            scanReopen.append(measureExecutionTime(lambda: scanTableReopening(engineReopen)))
+            scanPersistent.append(measureExecutionTime(lambda: engineBuffered.select(['*'], None)))
+
+            engineReopen.close()
+            engineUnbuffered.close()
+            engineBuffered.close()
+
+        results.append([
+            rowCount,
+            sum(insertReopen) / len(insertReopen),
+            sum(insertUnbuffered) / len(insertUnbuffered),
+            sum(insertBuffered) / len(insertBuffered),
+            sum(scanReopen) / len(scanReopen),
+            sum(scanPersistent) / len(scanPersistent)
+        ])
+
+    csvPath = os.path.join(resultsDir, csvFile)
+    with open(csvPath, 'w', encoding='utf-8') as f:
+        f.write("row_count,insert_reopen,insert_unbuffered,insert_buffered,scan_reopen,scan_persistent\n")
+        for row in results:
+            f.write(f"{row[0]},{row[1]},{row[2]},{row[3]},{row[4]},{row[5]}\n")
+
+    if showPlots:
+        builder = PlotBuilder(resultsDir)
+
+        xValues = [r[0] for r in results]
+
+        seriesData = {
+            'INSERT, открытие файла на каждую запись': (xValues, [r[1] for r in results]),
+            'INSERT, постоянный дескриптор без буфера': (xValues, [r[2] for r in results]),
+            'INSERT, постоянный дескриптор с буфером': (xValues, [r[3] for r in results]),
+            'Сканирование, открытие файла на каждую строку': (xValues, [r[4] for r in results]),
+            'Сканирование, постоянный дескриптор': (xValues, [r[5] for r in results])
+        }
+
+        builder.buildChart(
+            seriesData,
+            "SimpleDB: постоянный дескриптор и буфер записи",
+            "Количество строк",
+            "Время выполнения (сек)",
+            plotFile,
+            True
+        )
+
+def runBulkInsertBenchmark(resultsDir, showPlots, rowCounts, repeats):
+    dataDir = os.path.join(BASE_TEMP_DIR, 'bulk_insert')
+    csvFile = 'simpledb_bulk_insert.csv'
+    plotFile = 'simpledb_bulk_insert'
+
+    clearDataDir(dataDir)
+
+    results = []
+
+    for rowCount in rowCounts:
+        print(f"SimpleDB INSERT: тестируем {rowCount} строк (построчно и пакетом)")
+
+        timesRowByRow = []
+        timesBatch = []
+
+        for repeat in range(repeats):
+            engineRowByRow = createEngine(dataDir, createSchema("test_row_by_row", 'number', True))
+            engineBatch = createEngine(dataDir, createSchema("test_batch", 'number', True))
+
+            buildIndex(engineRowByRow, "id")
+            buildIndex(engineBatch, "id")
+
+            rows = generateNumberRows(rowCount, RANDOM_SEED_NUMBER)
+
+            def insertRowByRow():
+                for row in rows:
+                    engineRowByRow.insertRow(row)
+
+            timesRowByRow.append(measureExecutionTime(insertRowByRow))
+            timesBatch.append(measureExecutionTime(lambda: engineBatch.insertMany(rows)))
+
+            engineRowByRow.close()
+            engineBatch.close()
+
+        results.append([
+            rowCount,
+            sum(timesRowByRow) / len(timesRowByRow),
+            sum(timesBatch) / len(timesBatch)
+        ])
+
+    csvPath = os.path.join(resultsDir, csvFile)
+    with open(csvPath, 'w', encoding='utf-8') as f:
+        f.write("row_count,row_by_row,batch\n")
+        for row in results:
+            f.write(f"{row[0]},{row[1]},{row[2]}\n")
+
+    if showPlots:
+        builder = PlotBuilder(resultsDir)
+
+        xValues = [r[0] for r in results]
+
+        seriesData = {
+            'insertRow построчно': (xValues, [r[1] for r in results]),
+            'insertMany пакетом': (xValues, [r[2] for r in results])
+        }
+
+        builder.buildChart(
+            seriesData,
+            "SimpleDB: пакетная вставка с индексом",
+            "Количество строк",
+            "Время выполнения (сек)",
+            plotFile,
+            True
+        )
+
+LIKE_PREFIX_PATTERNS = ['A%', 'B%', 'C%', 'D%', 'E%', 'F%', 'G%', 'H%', 'Al%', 'Ch%']
+LIKE_CONTAINS_PATTERNS = ['%lic%', '%ob4%', '%harl%', '%iana%', '%orge7%']
+
+def measureLikePerformance(engine, patterns, queriesPerRun):
+    totalTime = 0
+
+    for queryIndex in range(queriesPerRun):
+        where = {'op': 'like', 'col': 'name', 'value': patterns[queryIndex % len(patterns)]}
+
+        def executeQuery():
+            return engine.select(['*'], where)
+
+        totalTime += measureExecutionTime(executeQuery)
+
+    return totalTime / queriesPerRun
+
+def runLikePrefixBenchmark(resultsDir, showPlots, rowCounts, repeats, queriesPerRun):
+    dataDir = os.path.join(BASE_TEMP_DIR, 'like_prefix')
+    csvFile = 'simpledb_like_prefix.csv'
+    plotFile = 'simpledb_like_prefix'
+
+    clearDataDir(dataDir)
+
+    results = []
+
+    for rowCount in rowCounts:
+        print(f"SimpleDB LIKE prefix%: тестируем {rowCount} строк")
+
+        timesWithIndex = []
+        timesWithoutIndex = []
+
+        for repeat in range(repeats):
+            engineWithIndex = createEngine(dataDir, createSchema("test_indexed", 'string', True))
+            engineWithoutIndex = createEngine(dataDir, createSchema("test_plain", 'string', False))
+
+            populateStringTable(engineWithIndex, rowCount, RANDOM_SEED_STRING)
+            populateStringTable(engineWithoutIndex, rowCount, RANDOM_SEED_STRING)
+
+            buildIndex(engineWithIndex, "name")
+
+            timesWithIndex.append(measureLikePerformance(engineWithIndex, LIKE_PREFIX_PATTERNS, queriesPerRun))
+            timesWithoutIndex.append(measureLikePerformance(engineWithoutIndex, LIKE_PREFIX_PATTERNS, queriesPerRun))
+
+            engineWithIndex.close()
+            engineWithoutIndex.close()
+
+        results.append([
+            rowCount,
+            sum(timesWithIndex) / len(timesWithIndex),
+            sum(timesWithoutIndex) / len(timesWithoutIndex)
+        ])
+
+    csvPath = os.path.join(resultsDir, csvFile)
+    with open(csvPath, 'w', encoding='utf-8') as f:
+        f.write("row_count,with_index,without_index\n")
+        for row in results:
+            f.write(f"{row[0]},{row[1]},{row[2]}\n")
+
+    if showPlots:
+        builder = PlotBuilder(resultsDir)
+
+        xValues = [r[0] for r in results]
+
+        seriesData = {
+            'С индексом': (xValues, [r[1] for r in results]),
+            'Без индекса': (xValues, [r[2] for r in results])
+        }
+
+        builder.buildChart(
+            seriesData,
+            "SimpleDB: LIKE 'prefix%' по строковому полю",
+            "Количество строк",
+            "Время выполнения (сек)",
+            plotFile,
+            True
+        )
+
+def runLikeContainsBenchmark(resultsDir, showPlots, rowCounts, repeats, queriesPerRun):
+    dataDir = os.path.join(BASE_TEMP_DIR, 'like_contains')
+    csvFile = 'simpledb_like_contains.csv'
+    plotFile = 'simpledb_like_contains'
+
+    clearDataDir(dataDir)
+
+    results = []
+
+    for rowCount in rowCounts:
+        print(f"SimpleDB LIKE %substring%: тестируем {rowCount} строк")
+
+        timesWithIndex = []
+        timesWithoutIndex = []
+
+        for repeat in range(repeats):
+            schemaWithIndex = Schema("test_trigram", [
+                {"name": "id", "type": "INT"},
+                {"name": "name", "type": "VARCHAR", "max": 32, "trigram": True}
+            ])
+            engineWithIndex = createEngine(dataDir, schemaWithIndex)
+            engineWithoutIndex = createEngine(dataDir, createSchema("test_plain", 'string', False))
+
+            populateStringTable(engineWithIndex, rowCount, RANDOM_SEED_STRING)
+            populateStringTable(engineWithoutIndex, rowCount, RANDOM_SEED_STRING)
+
+            timesWithIndex.append(measureLikePerformance(engineWithIndex, LIKE_CONTAINS_PATTERNS, queriesPerRun))
+            timesWithoutIndex.append(measureLikePerformance(engineWithoutIndex, LIKE_CONTAINS_PATTERNS, queriesPerRun))
+
+            engineWithIndex.close()
+            engineWithoutIndex.close()
+
+        results.append([
+            rowCount,
+            sum(timesWithIndex) / len(timesWithIndex),
+            sum(timesWithoutIndex) / len(timesWithoutIndex)
+        ])
+
+    csvPath = os.path.join(resultsDir, csvFile)
+    with open(csvPath, 'w', encoding='utf-8') as f:
+        f.write("row_count,with_index,without_index\n")
+        for row in results:
+            f.write(f"{row[0]},{row[1]},{row[2]}\n")
+
+    if showPlots:
+        builder = PlotBuilder(resultsDir)
+
+        xValues = [r[0] for r in results]
+
+        seriesData = {
+            'Триграммный индекс': (xValues, [r[1] for r in results]),
+            'Без индекса': (xValues, [r[2] for r in results])
+        }
+
+        builder.buildChart(
+            seriesData,
+            "SimpleDB: LIKE '%substring%' по строковому полю",
+            "Количество строк",
+            "Время выполнения (сек)",
+            plotFile,
+            True
+        )
+
+ORDER_LIMIT = 10
+
+def measureOrderPerformance(engine, orderBy, limit, queriesPerRun):
+    totalTime = 0
+
+    for queryIndex in range(queriesPerRun):
+        def executeQuery():
+            return engine.select(['*'], None, orderBy, limit)
+
+        totalTime += measureExecutionTime(executeQuery)
+
+    return totalTime / queriesPerRun
+
+def runOrderLimitBenchmark(resultsDir, showPlots, rowCounts, repeats, queriesPerRun):
+    dataDir = os.path.join(BASE_TEMP_DIR, 'order_limit')
+    csvFile = 'simpledb_order_limit.csv'
+    plotFile = 'simpledb_order_limit'
+
+    clearDataDir(dataDir)
+
+    results = []
+    orderBy = {'col': 'id', 'desc': True}
+
+    for rowCount in rowCounts:
+        print(f"SimpleDB ORDER BY ... LIMIT: тестируем {rowCount} строк")
+
+        timesIndexOrder = []
+        timesHeap = []
+        timesFullSort = []
+
+        for repeat in range(repeats):
+            engineWithIndex = createEngine(dataDir, createSchema("test_indexed", 'number', True))
+            engineWithoutIndex = createEngine(dataDir, createSchema("test_plain", 'number', False))
+
+            populateNumberTable(engineWithIndex, rowCount, RANDOM_SEED_NUMBER)
+            populateNumberTable(engineWithoutIndex, rowCount, RANDOM_SEED_NUMBER)
+
+            buildIndex(engineWithIndex, "id")
+
+            timesIndexOrder.append(measureOrderPerformance(engineWithIndex, orderBy, ORDER_LIMIT, queriesPerRun))
+            timesHeap.append(measureOrderPerformance(engineWithoutIndex, orderBy, ORDER_LIMIT, queriesPerRun))
+            timesFullSort.append(measureOrderPerformance(engineWithoutIndex, orderBy, None, queriesPerRun))
+
+            engineWithIndex.close()
+            engineWithoutIndex.close()
+
+        results.append([
+            rowCount,
+            sum(timesIndexOrder) / len(timesIndexOrder),
+            sum(timesHeap) / len(timesHeap),
+            sum(timesFullSort) / len(timesFullSort)
+        ])
+
+    csvPath = os.path.join(resultsDir, csvFile)
+    with open(csvPath, 'w', encoding='utf-8') as f:
+        f.write("row_count,index_order_limit,heap_top_k,full_sort\n")
+        for row in results:
+            f.write(f"{row[0]},{row[1]},{row[2]},{row[3]}\n")
+
+    if showPlots:
+        builder = PlotBuilder(resultsDir)
+
+        xValues = [r[0] for r in results]
+
+        seriesData = {
+            'Обход индекса, LIMIT': (xValues, [r[1] for r in results]),
+            'Куча top-k, LIMIT': (xValues, [r[2] for r in results]),
+            'Полная сортировка': (xValues, [r[3] for r in results])
+        }
+
+        builder.buildChart(
+            seriesData,
+            f"SimpleDB: ORDER BY id DESC LIMIT {ORDER_LIMIT}",
+            "Количество строк",
+            "Время выполнения (сек)",
+            plotFile,
+            True
+        )
+
 def runSimpleDbSelectNumber(resultsDir, showPlots, rowCounts, repeats, queriesPerRun):
     runSelectBenchmark('number', resultsDir, showPlots, rowCounts, repeats, queriesPerRun)
 
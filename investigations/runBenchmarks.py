@@ -13,7 +13,10 @@ from investigations.benchmarks.generationSpeed import measureGenerationSpeed
 from investigations.databaseOperationsResearch import selectNumberField, selectNumberFieldViewer, selectNumberFieldViewerProfile, selectDateField, selectDateFieldViewer, selectDateFieldViewerProfile, insertMovieData, insertViewerData, insertViewerProfileData, measureDeleteWhere, measureDeleteWhereViewer, measureDeleteWhereViewerProfile, measureJoinOperations, measureComplexJoinOperations, measureManyToManyJoin
 from investigations.indexPerformanceResearch import measurePkIndexEffect, measurePkInequalityEffect, measurePkInsertEffect, measureStringIndexExperiment, measureStringLikePrefix, measureStringLikeContains, measureStringInsertExperiment, measureFtsSingleWordExperiment, measureFtsMultiWordExperiment, measureFtsInsertExperiment
 from investigations.researchUtils import SANDBOX_SCHEMA_NAME
-from investigations.benchmarks.simpledbBenchmarks import runSimpleDbDeleteNumber, runSimpleDbDeleteString, runSimpleDbInsertNumber, runSimpleDbInsertString, runSimpleDbSelectNumber, runSimpleDbSelectString
+from investigations.benchmarks.simpledbBenchmarks import runSimpleDbDeleteNumber, runSimpleDbDeleteString, runSimpleDbInsertNumber, runSimpleDbInsertString, runSimpleDbSelectNumber, runSimpleDbSelectString, runIoBufferBenchmark, runBulkInsertBenchmark, runLikePrefixBenchmark, runLikeContainsBenchmark, runOrderLimitBenchmark
+from investigations.benchmarks.rowcodecBenchmarks import runRowDecodeBenchmark, runPredicateEvalBenchmark
+from investigations.benchmarks.fulltextBenchmarks import runFulltextBenchmark
+from investigations.benchmarks.joinBenchmarks import runJoinBenchmark
 
 
 def runBenchmarks(configPath: str, disablePk: bool, disableStringIndex: bool, disableFts: bool, disableSimpleDb: bool) -> None:
@@ -87,6 +90,15 @@ def runBenchmarks(configPath: str, disablePk: bool, disableStringIndex: bool, di
     simpleDbInsertStringDir = os.path.join(simpleDbDir, '4_insert_string')
     simpleDbDeleteNumberDir = os.path.join(simpleDbDir, '5_delete_number')
     simpleDbDeleteStringDir = os.path.join(simpleDbDir, '6_delete_string')
+    simpleDbIoBufferDir = os.path.join(simpleDbDir, '7_io_buffer')
+    simpleDbBulkInsertDir = os.path.join(simpleDbDir, '8_bulk_insert')
+    simpleDbRowDecodeDir = os.path.join(simpleDbDir, '9_row_decode')
+    simpleDbLikePrefixDir = os.path.join(simpleDbDir, '10_like_prefix')
+    simpleDbLikeContainsDir = os.path.join(simpleDbDir, '11_like_contains')
+    simpleDbFulltextDir = os.path.join(simpleDbDir, '12_fulltext')
+    simpleDbJoinDir = os.path.join(simpleDbDir, '13_join')
+    simpleDbOrderLimitDir = os.path.join(simpleDbDir, '14_order_limit')
+    simpleDbPredicateEvalDir = os.path.join(simpleDbDir, '15_predicate_eval')
 
     allSubdirectories = [
         operationsSelectNumberDir, operationsSelectDateDir, operationsInsertDir,
@@ -96,7 +108,10 @@ def runBenchmarks(configPath: str, disablePk: bool, disableStringIndex: bool, di
         stringSelectLikeContainsDir, stringInsertDir, ftsSelectSingleWordDir,
         ftsSelectMultiWordDir, ftsInsertDir, simpleDbSelectNumberDir,
         simpleDbSelectStringDir, simpleDbInsertNumberDir, simpleDbInsertStringDir,
-        simpleDbDeleteNumberDir, simpleDbDeleteStringDir
+        simpleDbDeleteNumberDir, simpleDbDeleteStringDir, simpleDbIoBufferDir,
+        simpleDbBulkInsertDir, simpleDbRowDecodeDir, simpleDbLikePrefixDir,
+        simpleDbLikeContainsDir, simpleDbFulltextDir, simpleDbJoinDir,
+        simpleDbOrderLimitDir, simpleDbPredicateEvalDir
     ]
 
     for directory in allSubdirectories:
@@ -411,6 +426,24 @@ def runBenchmarks(configPath: str, disablePk: bool, disableStringIndex: bool, di
         runSimpleDbDeleteNumber(simpleDbDeleteNumberDir, True, simpleDbRowCounts, simpleDbRepeats, simpleDbQueriesPerRun)
         print("SimpleDB: DELETE WHERE по строковому полю (с индексом и без) →", simpleDbDeleteStringDir)
         runSimpleDbDeleteString(simpleDbDeleteStringDir, True, simpleDbRowCounts, simpleDbRepeats, simpleDbQueriesPerRun)
+        print("SimpleDB: постоянный дескриптор и буфер записи →", simpleDbIoBufferDir)
+        runIoBufferBenchmark(simpleDbIoBufferDir, True, simpleDbRowCounts, simpleDbRepeats)
+        print("SimpleDB: построчная и пакетная вставка →", simpleDbBulkInsertDir)
+        runBulkInsertBenchmark(simpleDbBulkInsertDir, True, simpleDbRowCounts, simpleDbRepeats)
+        print("SimpleDB: декодирование строк (unpackValue и скомпилированная проекция) →", simpleDbRowDecodeDir)
+        runRowDecodeBenchmark(simpleDbRowDecodeDir, True, simpleDbRowCounts, simpleDbRepeats)
+        print("SimpleDB: LIKE 'prefix%' со строковым индексом и без →", simpleDbLikePrefixDir)
+        runLikePrefixBenchmark(simpleDbLikePrefixDir, True, simpleDbRowCounts, simpleDbRepeats, simpleDbQueriesPerRun)
+        print("SimpleDB: LIKE '%substring%' с триграммным индексом и без →", simpleDbLikeContainsDir)
+        runLikeContainsBenchmark(simpleDbLikeContainsDir, True, simpleDbRowCounts, simpleDbRepeats, simpleDbQueriesPerRun)
+        print("SimpleDB: полнотекстовый поиск MATCH с индексом и без →", simpleDbFulltextDir)
+        runFulltextBenchmark(simpleDbFulltextDir, True, simpleDbRowCounts, simpleDbRepeats, simpleDbQueriesPerRun)
+        print("SimpleDB: JOIN вложенными циклами по индексу и хеш-соединением →", simpleDbJoinDir)
+        runJoinBenchmark(simpleDbJoinDir, True, simpleDbRowCounts, simpleDbRepeats)
+        print("SimpleDB: ORDER BY ... LIMIT обходом индекса, кучей и полной сортировкой →", simpleDbOrderLimitDir)
+        runOrderLimitBenchmark(simpleDbOrderLimitDir, True, simpleDbRowCounts, simpleDbRepeats, simpleDbQueriesPerRun)
+        print("SimpleDB: условия WHERE по закодированным байтам и с декодированием →", simpleDbPredicateEvalDir)
+        runPredicateEvalBenchmark(simpleDbPredicateEvalDir, True, simpleDbRowCounts, simpleDbRepeats)
 
     print("Все исследования завершены. Результаты сохранены в:", resultsDir)
 
@@ -0,0 +1,73 @@
+from array import array
+import struct
+import sys
+
+PACK_MAGIC = 0x0102040810204080
+BITMAP_MAGIC = b'SDRB'
+BITMAP_HEADER = struct.Struct('<4sQQQ')
+
+class RowBitmap:
+    def __init__(self):
+        self.bits = bytearray()
+        self.size = 0
+
+    @staticmethod
+    def fromFlags(flags):
+        bm = RowBitmap()
+        n = len(flags)
+        padded = bytes(flags) + b'\x00' * ((8 - n % 8) % 8)
+        words = array('Q')
+        words.frombytes(padded)
+        if sys.byteorder != 'little':
+            words.byteswap()
+        bm.bits = bytearray(((w * PACK_MAGIC) >> 56) & 0xFF for w in words)
+        bm.size = n
+        return bm
+
+    @staticmethod
+    def fromBytes(bits, size):
+        bm = RowBitmap()
+        bm.bits = bytearray(bits)
+        bm.size = size
+        return bm
+
+    def append(self, flag):
+        if self.size & 7 == 0:
+            self.bits.append(0)
+        if flag:
+            self.bits[self.size >> 3] |= 1 << (self.size & 7)
+        self.size += 1
+
+    def extend(self, count, flag):
+        i = 0
+        while i < count and self.size & 7 != 0:
+            self.append(flag)
+            i += 1
+        full = (count - i) >> 3
+        self.bits += (b'\xff' if flag else b'\x00') * full
+        self.size += full << 3
+        i += full << 3
+        while i < count:
+            self.append(flag)
+            i += 1
+
+    def isSet(self, i):
+        if i < 0 or i >= self.size:
+            return False
+        return (self.bits[i >> 3] >> (i & 7)) & 1 == 1
+
+    def set(self, i):
+        self.bits[i >> 3] |= 1 << (i & 7)
+
+    def clear(self, i):
+        self.bits[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+
+    def count(self):
+        return int.from_bytes(self.bits, 'little').bit_count()
+
+    def reset(self):
+        self.bits = bytearray()
+        self.size = 0
+
+    def __len__(self):
+        return self.size
@@ -1,4 +1,8 @@
 import os
 DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'simpledb_data')
 MAX_UINT64 = (1 << 64) - 1
-
+WRITE_BUFFER_SIZE = 64 * 1024
+STATEMENT_CACHE_SIZE = 256
+INDEX_LOG_MIN_RECORDS = 4096
+INDEX_TOMBSTONE_LIMIT = 4096
+CURSOR_ARRAY_SIZE = 1
@@ -0,0 +1,49 @@
+from itertools import islice
+from .constants import CURSOR_ARRAY_SIZE
+
+
+class Cursor:
+    def __init__(self, db, arraysize=CURSOR_ARRAY_SIZE):
+        self.db = db
+        self.arraysize = arraysize
+        self.rows = iter(())
+        self.closed = False
+
+    def _checkOpen(self):
+        if self.closed:
+            raise ValueError('cursor is closed')
+
+    def execute(self, sql, params=()):
+        self._checkOpen()
+        self.rows = self.db._statement(sql).iterate(params)
+        return self
+
+    def fetchone(self):
+        self._checkOpen()
+        return next(self.rows, None)
+
+    def fetchmany(self, size=None):
+        self._checkOpen()
+        return list(islice(self.rows, self.arraysize if size is None else size))
+
+    def fetchall(self):
+        self._checkOpen()
+        return list(self.rows)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self._checkOpen()
+        return next(self.rows)
+
+    def close(self):
+        self.rows = iter(())
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, tb):
+        self.close()
+        return False
@@ -1,18 +1,25 @@
 import os
 import json
-from .constants import DATA_DIR
+from collections import OrderedDict
+from .constants import DATA_DIR, STATEMENT_CACHE_SIZE
 from .schema import Schema
 from .paths import TableFiles
 from .engine.table_engine import TableEngine
-from .indexes import IntIndex
+from .engine.join import JoinSource, JoinPlan
+from .engine.aggregate import AggregatePlan
+from .engine.ordering import limitRows, orderRows
+from .cursor import Cursor
 from .parser.sqlParser import parseSql
+from .prepared import PreparedStatement
 
 class SimpleDatabase:
-    def __init__(self, dataDir=DATA_DIR):
+    def __init__(self, dataDir=DATA_DIR, statementCacheSize=STATEMENT_CACHE_SIZE):
         self.dataDir = os.path.abspath(dataDir)
         if not os.path.isdir(self.dataDir):
             os.makedirs(self.dataDir, exist_ok=True)
         self.tables = {}
+        self.statementCacheSize = statementCacheSize
+        self.statementCache = OrderedDict()
 
     def _loadSchema(self, tableName):
         files = TableFiles(self.dataDir, tableName)
@@ -36,46 +43,45 @@ class SimpleDatabase:
         return eng
 
     def createTable(self, tableName, columns):
+        old = self.tables.get(tableName)
+        if old is not None:
+            old.close()
         files = TableFiles(self.dataDir, tableName)
-        sch = Schema(tableName, columns)
+        sch = Schema(tableName, [dict(c) for c in columns])
         eng = TableEngine(files, sch)
         eng.create()
         self.tables[tableName] = eng
         return True
 
-    def createIndex(self, tableName, colName):
+    def createIndex(self, tableName, colName, kind='value'):
         eng = self._getEngine(tableName)
         if eng is None:
             return False
-        foundIndex = -1
-        for columnIndex in range(len(eng.schema.columns)):
-            colDef = eng.schema.columns[columnIndex]
-            if colDef['name'] == colName and colDef['type'] == 'INT':
-                colDef['index'] = True
-                foundIndex = columnIndex
-                break
+        foundIndex = eng.schema.columnIndex(colName)
         if foundIndex < 0:
             return False
+        colType = eng.schema.types[foundIndex]
+        if kind in ('trigram', 'fulltext'):
+            if colType != 'VARCHAR':
+                return False
+            flag = kind
+        else:
+            if colType not in ('INT', 'VARCHAR'):
+                return False
+            flag = 'index'
+        eng.schema.columns[foundIndex][flag] = True
+        eng.schema.invalidate()
         with open(eng.files.schemaPath(), 'w', encoding='utf-8') as f:
             json.dump(eng.schema.toDict(), f, ensure_ascii=False)
-        indexObj = IntIndex(eng.files.indexPath(colName))
-        totalRows = eng.rowCount()
-        for rowId in range(totalRows):
-            if eng._isRowActive(rowId):
-                rowBytes = eng._readRowBytes(rowId)
-                if rowBytes is None:
-                    continue
-                value = eng._readColumnValueRaw(rowBytes, foundIndex)
-                if value is not None:
-                    try:
-                        indexObj.add(int(value), rowId)
-                    except Exception:
-                        pass
-        indexObj.save()
-        eng.indexes[colName] = indexObj
+        eng._rebuildSingleIndex(colName)
         return True
 
     def dropDataDir(self):
+        for name in list(self.tables.keys()):
+            try:
+                self.tables[name]._closeDataFile()
+            except Exception:
+                pass
         if os.path.isdir(self.dataDir):
             names = os.listdir(self.dataDir)
             for fileName in names:
@@ -92,31 +98,110 @@ class SimpleDatabase:
             except Exception:
                 pass
 
-    def execute(self, sql):
-        cmd = parseSql(sql)
+    def prepare(self, sql):
+        return self._statement(sql, True)
+
+    def _statement(self, sql, cacheLiteral=False):
+        stmt = self.statementCache.get(sql)
+        if stmt is not None:
+            self.statementCache.move_to_end(sql)
+            return stmt
+        stmt = PreparedStatement(self, parseSql(sql))
+        if self.statementCacheSize > 0 and (cacheLiteral or stmt.paramCount > 0):
+            self.statementCache[sql] = stmt
+            if len(self.statementCache) > self.statementCacheSize:
+                self.statementCache.popitem(last=False)
+        return stmt
+
+    def execute(self, sql, params=()):
+        return self._statement(sql).execute(params)
+
+    def cursor(self):
+        return Cursor(self)
+
+    def executeMany(self, sqlList):
+        pendingTable = None
+        pendingRows = []
+        for sql in sqlList:
+            cmd = parseSql(sql)
+            if cmd.get('type') != 'insert':
+                self._insertRows(pendingTable, pendingRows)
+                pendingTable = None
+                pendingRows = []
+                self._executeCommand(cmd)
+                continue
+            d = cmd['data']
+            if d['table'] != pendingTable:
+                self._insertRows(pendingTable, pendingRows)
+                pendingTable = d['table']
+                pendingRows = []
+            for values in d['rows']:
+                pendingRows.append(dict(zip(d['columns'], values)))
+        self._insertRows(pendingTable, pendingRows)
+        return []
+
+    def _insertRows(self, tableName, rows):
+        if tableName is None or len(rows) == 0:
+            return
+        eng = self._getEngine(tableName)
+        if eng is None:
+            return
+        eng.insertMany(rows)
+
+    def planJoin(self, data, where=None, colNames=None):
+        sources = []
+        refs = [(data['table'], data['alias'])]
+        for j in data['joins']:
+            refs.append((j['table'], j['alias']))
+        for tableName, alias in refs:
+            eng = self._getEngine(tableName)
+            if eng is None:
+                return None
+            sources.append(JoinSource(alias, tableName, eng))
+        return JoinPlan(sources, data['joins'], data['columns'] if colNames is None else colNames, where)
+
+    def _iterJoin(self, data, where, limit=None):
+        aggregates = data.get('aggregates')
+        orderBy = data.get('orderBy')
+        if aggregates is None:
+            plan = self.planJoin(data, where)
+            if plan is None:
+                return iter(())
+            if orderBy is None:
+                return limitRows(plan.rows(), limit)
+            width = len(plan.output)
+            pos = plan.outputColumn(orderBy['col'])
+            if pos < 0:
+                raise ValueError('unknown ORDER BY column: ' + orderBy['col'])
+            ordered = orderRows(plan.rows(), pos, orderBy['desc'], limit, width)
+            return plan.track(row for row in ordered)
+        agg = AggregatePlan(aggregates, data['groupBy'])
+        plan = self.planJoin(data, where, agg.inputs)
+        if plan is None or len(plan.output) != len(agg.inputs):
+            return iter(())
+        agg.checkTypes(plan.outputTypes())
+        return iter(agg.run(plan.rows(), orderBy, limit))
+
+    def _executeJoin(self, data, where, limit=None):
+        return list(self._iterJoin(data, where, limit))
+
+    def _executeCommand(self, cmd):
         t = cmd.get('type')
         d = cmd.get('data', {})
         if t == 'create_table':
             return [] if self.createTable(d['table'], d['columns']) else []
         if t == 'create_index':
-            self.createIndex(d['table'], d['column'])
-            return []
-        if t == 'insert':
-            eng = self._getEngine(d['table'])
-            if eng is None:
-                return []
-            row = {}
-            cols = d['columns']
-            vals = d['values']
-            for j in range(len(cols)):
-                row[cols[j]] = vals[j]
-            eng.insertRow(row)
+            self.createIndex(d['table'], d['column'], d.get('kind', 'value'))
             return []
         if t == 'select':
             eng = self._getEngine(d['table'])
             if eng is None:
                 return []
-            return eng.select(d['columns'], d['where'])
+            if d.get('aggregates') is not None:
+                return eng.aggregate(d['aggregates'], d['groupBy'], d['where'], d.get('orderBy'), d.get('limit'))
+            return eng.select(d['columns'], d['where'], d.get('orderBy'), d.get('limit'))
+        if t == 'select_join':
+            return self._executeJoin(d, d['where'], d.get('limit'))
         if t == 'delete_all':
             eng = self._getEngine(d['table'])
             if eng is not None:
@@ -126,7 +211,9 @@ class SimpleDatabase:
             eng = self._getEngine(d['table'])
             if eng is not None:
                 w = d.get('where')
-                if w:
+                if isinstance(w, dict):
+                    eng.deleteMatching(w)
+                elif w:
                     eng.deleteWhere(w[0], w[1])
             return []
         return []
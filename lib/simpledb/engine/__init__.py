@@ -1,3 +1,4 @@
 from .table_engine import TableEngine
-__all__ = ['TableEngine']
-
+from .join import JoinPlan
+from .aggregate import AggregatePlan
+__all__ = ['TableEngine', 'JoinPlan', 'AggregatePlan']
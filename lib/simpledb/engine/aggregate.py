@@ -0,0 +1,112 @@
+from .ordering import takeRows, orderRows
+
+AGGREGATE_FUNCS = ('count', 'sum', 'min', 'max', 'avg')
+NUMERIC_FUNCS = ('sum', 'avg')
+
+
+class AggregatePlan:
+    def __init__(self, items, groupBy):
+        self.items = items
+        self.groupCount = len(groupBy)
+        self.inputs = list(groupBy)
+        self.specs = []
+        self.output = []
+        for item in items:
+            func = item['func']
+            col = item['col']
+            if func is None:
+                if col not in groupBy:
+                    raise ValueError('column must appear in GROUP BY: ' + col)
+                self.output.append((False, groupBy.index(col)))
+                continue
+            pos = None
+            if col != '*':
+                if col not in self.inputs:
+                    self.inputs.append(col)
+                pos = self.inputs.index(col)
+            self.output.append((True, len(self.specs)))
+            self.specs.append((func, pos))
+
+    def checkTypes(self, types):
+        for func, pos in self.specs:
+            if func in NUMERIC_FUNCS and types[pos] != 'INT':
+                raise ValueError(func.upper() + ' requires an INT column: ' + self.inputs[pos])
+
+    def countOnly(self):
+        if self.groupCount:
+            return False
+        for func, pos in self.specs:
+            if func != 'count':
+                return False
+        return True
+
+    def _finish(self, key, state):
+        values = []
+        i = 0
+        for func, pos in self.specs:
+            n = state[i]
+            acc = state[i + 1]
+            if func == 'count':
+                values.append(n)
+            elif n == 0:
+                values.append(None)
+            elif func == 'avg':
+                values.append(acc / n)
+            else:
+                values.append(acc)
+            i = i + 2
+        return tuple(values[p] if isAgg else key[p] for isAgg, p in self.output)
+
+    def outputPosition(self, name):
+        key = name.replace(' ', '').lower()
+        for i, item in enumerate(self.items):
+            if item['func'] is None:
+                if item['col'] == name:
+                    return i
+            elif (item['func'] + '(' + item['col'] + ')').lower() == key:
+                return i
+        raise ValueError('unknown ORDER BY column: ' + name)
+
+    def order(self, results, orderBy=None, limit=None):
+        if orderBy is None:
+            return takeRows(results, limit)
+        return orderRows(results, self.outputPosition(orderBy['col']), orderBy['desc'], limit)
+
+    def run(self, rows, orderBy=None, limit=None):
+        specs = self.specs
+        groupCount = self.groupCount
+        groups = {}
+        for row in rows:
+            key = row[:groupCount]
+            state = groups.get(key)
+            if state is None:
+                state = [0, None] * len(specs)
+                groups[key] = state
+            i = 0
+            for func, pos in specs:
+                if pos is None:
+                    state[i] = state[i] + 1
+                    i = i + 2
+                    continue
+                v = row[pos]
+                if v is None:
+                    i = i + 2
+                    continue
+                if state[i] == 0:
+                    state[i + 1] = v
+                elif func == 'sum' or func == 'avg':
+                    state[i + 1] = state[i + 1] + v
+                elif func == 'min':
+                    if v < state[i + 1]:
+                        state[i + 1] = v
+                elif func == 'max':
+                    if v > state[i + 1]:
+                        state[i + 1] = v
+                state[i] = state[i] + 1
+                i = i + 2
+        if not groups and groupCount == 0:
+            groups[()] = [0, None] * len(specs)
+        return self.order([self._finish(key, state) for key, state in groups.items()], orderBy, limit)
+
+    def fromCount(self, n, orderBy=None, limit=None):
+        return self.order([tuple(n for isAgg, p in self.output)], orderBy, limit)
@@ -0,0 +1,225 @@
+from ..predicates import normalizeWhere, compileMatcher, compileValueMatcher
+
+JOIN_INDEX = 'index'
+JOIN_HASH = 'hash'
+
+
+def _predicateColumns(pred, out):
+    if pred['op'] == 'and' or pred['op'] == 'or':
+        for p in pred['args']:
+            _predicateColumns(p, out)
+    else:
+        out.append(pred['col'])
+    return out
+
+
+def _renameColumns(pred, names):
+    if pred['op'] == 'and' or pred['op'] == 'or':
+        return {'op': pred['op'], 'args': [_renameColumns(p, names) for p in pred['args']]}
+    res = dict(pred)
+    res['col'] = names[pred['col']]
+    return res
+
+
+class JoinSource:
+    def __init__(self, alias, tableName, engine):
+        self.alias = alias
+        self.tableName = tableName
+        self.engine = engine
+        self.need = []
+        self.positions = {}
+        self.filters = []
+
+    def column(self, colIdx):
+        pos = self.positions.get(colIdx)
+        if pos is None:
+            pos = len(self.need)
+            self.need.append(colIdx)
+            self.positions[colIdx] = pos
+        return pos
+
+    def predicate(self):
+        if len(self.filters) == 0:
+            return None
+        if len(self.filters) == 1:
+            return self.filters[0]
+        return {'op': 'and', 'args': self.filters}
+
+
+class JoinPlan:
+    def __init__(self, sources, joins, colNames, where=None):
+        self.sources = sources
+        self.steps = []
+        self.strategies = []
+        self.output = []
+        self.valid = True
+        self.residual = None
+        for j in joins:
+            self._addStep(j)
+        self._resolveOutput(colNames)
+        if where is not None:
+            self._pushDown(normalizeWhere(where))
+
+    def _lookup(self, name, limit):
+        p = name.find('.')
+        qualifier = None if p < 0 else name[:p]
+        colName = name if p < 0 else name[p+1:]
+        s = 0
+        while s < limit:
+            src = self.sources[s]
+            if qualifier is None or qualifier == src.alias or qualifier == src.tableName:
+                colIdx = src.engine.columnIndex(colName)
+                if colIdx >= 0:
+                    return s, colIdx
+            s = s + 1
+        return -1, -1
+
+    def _addStep(self, join):
+        inner = len(self.steps) + 1
+        a = self._lookup(join['left'], inner + 1)
+        b = self._lookup(join['right'], inner + 1)
+        if a[0] == inner and b[0] != inner:
+            a, b = b, a
+        if a[0] < 0 or b[0] != inner:
+            self.valid = False
+            return
+        outerSrc = self.sources[a[0]]
+        innerSrc = self.sources[inner]
+        innerEng = innerSrc.engine
+        colName = innerEng.schema.columns[b[1]]['name']
+        strategy = JOIN_HASH
+        sameType = outerSrc.engine.schema.types[a[1]] == innerEng.schema.types[b[1]]
+        if sameType and innerEng.indexes.get(colName) is not None:
+            strategy = JOIN_INDEX
+        self.steps.append((a[0], outerSrc.column(a[1]), b[1], innerSrc.column(b[1]), strategy))
+        self.strategies.append(strategy)
+
+    def _resolveOutput(self, colNames):
+        if colNames == ['*']:
+            for s, src in enumerate(self.sources):
+                for colIdx in range(len(src.engine.schema.types)):
+                    self.output.append((s, src.column(colIdx)))
+            return
+        for name in colNames:
+            self.outputColumn(name)
+
+    def outputColumn(self, name):
+        s, colIdx = self._lookup(name, len(self.sources))
+        if s < 0:
+            return -1
+        self.output.append((s, self.sources[s].column(colIdx)))
+        return len(self.output) - 1
+
+    def outputTypes(self):
+        res = []
+        for s, p in self.output:
+            src = self.sources[s]
+            res.append(src.engine.schema.types[src.need[p]])
+        return res
+
+    def _pushDown(self, pred):
+        parts = pred['args'] if pred['op'] == 'and' else [pred]
+        residual = []
+        for part in parts:
+            names = {}
+            owners = set()
+            unknown = False
+            for name in _predicateColumns(part, []):
+                s, colIdx = self._lookup(name, len(self.sources))
+                if s < 0:
+                    unknown = True
+                    continue
+                owners.add(s)
+                names[name] = self.sources[s].engine.schema.columns[colIdx]['name']
+            if not owners:
+                self.valid = False
+                return
+            if len(owners) == 1 and not unknown:
+                self.sources[owners.pop()].filters.append(_renameColumns(part, names))
+            else:
+                residual.append(part)
+        if residual:
+            pred = residual[0] if len(residual) == 1 else {'op': 'and', 'args': residual}
+            self.residual = compileValueMatcher(pred, self._residualColumn)
+
+    def _residualColumn(self, name):
+        s, colIdx = self._lookup(name, len(self.sources))
+        if s < 0:
+            return None
+        pos = self.sources[s].column(colIdx)
+        return (lambda row: row[s][pos]), self.sources[s].engine.schema.types[colIdx]
+
+    def _scan(self, src):
+        project = src.engine.schema.decoder.projection(src.need)
+        for rid, data in src.engine._iterMatching(src.predicate()):
+            yield (project(data),)
+
+    def _indexJoin(self, rows, step, src):
+        outerPos, outerCol, innerIdx, innerCol, strategy = step
+        eng = src.engine
+        idx = eng.indexes[eng.schema.columns[innerIdx]['name']]
+        project = eng.schema.decoder.projection(src.need)
+        pred = src.predicate()
+        matches = None if pred is None else compileMatcher(pred, eng.schema)
+        view = eng._getDataView()
+        offsets = eng.rowOffsets
+        lengths = eng.rowLengths
+        bits = eng.activeRows.bits
+        cache = {}
+        for row in rows:
+            key = row[outerPos][outerCol]
+            found = cache.get(key)
+            if found is None:
+                found = []
+                for rid in idx.getRowIds(key):
+                    if (bits[rid >> 3] >> (rid & 7)) & 1:
+                        off = offsets[rid]
+                        data = view[off:off + lengths[rid]]
+                        if matches is not None and not matches(data):
+                            continue
+                        values = project(data)
+                        if values[innerCol] == key:
+                            found.append(values)
+                cache[key] = found
+            for values in found:
+                yield row + (values,)
+
+    def _hashJoin(self, rows, step, src):
+        outerPos, outerCol, innerIdx, innerCol, strategy = step
+        table = {}
+        for values, in self._scan(src):
+            key = values[innerCol]
+            bucket = table.get(key)
+            if bucket is None:
+                table[key] = [values]
+            else:
+                bucket.append(values)
+        for row in rows:
+            bucket = table.get(row[outerPos][outerCol])
+            if bucket is not None:
+                for values in bucket:
+                    yield row + (values,)
+
+    def track(self, rows):
+        for src in self.sources:
+            src.engine._track(rows)
+        return rows
+
+    def rows(self):
+        return self.track(self._rows())
+
+    def _rows(self):
+        if not self.valid:
+            return
+        rows = self._scan(self.sources[0])
+        for i, step in enumerate(self.steps):
+            src = self.sources[i + 1]
+            if step[4] == JOIN_INDEX:
+                rows = self._indexJoin(rows, step, src)
+            else:
+                rows = self._hashJoin(rows, step, src)
+        output = self.output
+        residual = self.residual
+        for row in rows:
+            if residual is None or residual(row):
+                yield tuple(row[s][p] for s, p in output)
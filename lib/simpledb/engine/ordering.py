@@ -0,0 +1,27 @@
+import heapq
+from itertools import islice
+
+
+def limitRows(rows, limit):
+    if limit is None:
+        return rows
+    return islice(rows, limit)
+
+
+def takeRows(rows, limit):
+    return list(limitRows(rows, limit))
+
+
+def topRows(rows, key, desc, limit):
+    if limit is None:
+        return sorted(rows, key=key, reverse=desc)
+    if desc:
+        return heapq.nlargest(limit, rows, key=key)
+    return heapq.nsmallest(limit, rows, key=key)
+
+
+def orderRows(rows, position, desc, limit, width=None):
+    res = topRows(rows, lambda row: (row[position] is not None, row[position]), desc, limit)
+    if width is not None:
+        res = [row[:width] for row in res]
+    return res
@@ -1,49 +1,85 @@
 import os
 import json
+import mmap
 import struct
+import sys
+import operator
+import weakref
+from array import array
 from ..schema import Schema
 from ..paths import TableFiles
-from ..indexes import IntIndex, StrIndex
-from ..rowcodec import packValue, unpackValue
+from ..indexes import IntIndex, StrIndex, TrigramIndex, FullTextIndex
+from ..indexes.postings import intersectSorted, unionSorted
+from ..constants import WRITE_BUFFER_SIZE
+from ..bitmap import RowBitmap, BITMAP_MAGIC, BITMAP_HEADER
+from ..rowcodec import storedText
+from ..predicates import normalizeWhere, compileMatcher, convertValue, likePrefix
+from .aggregate import AggregatePlan
+from .ordering import limitRows, topRows
 
 BASE_FIXED_HEADER = 1 + 4 + 2
+TEXT_INDEX_KINDS = (
+    ('trigram', TrigramIndex, 'trigramPath'),
+    ('fulltext', FullTextIndex, 'fulltextPath')
+)
 
 class TableEngine:
-    def __init__(self, files: TableFiles, schema: Schema):
+    def __init__(self, files: TableFiles, schema: Schema, writeBufferSize=WRITE_BUFFER_SIZE):
         self.files = files
         self.schema = schema
         self.indexes = {}
-        self.rowOffsets = []
-        self.rowLengths = []
+        self.trigramIndexes = {}
+        self.fulltextIndexes = {}
+        self.textIndexes = {'trigram': self.trigramIndexes, 'fulltext': self.fulltextIndexes}
+        self.rowOffsets = array('Q')
+        self.rowLengths = array('I')
+        self.activeRows = RowBitmap()
+        self.liveRows = 0
+        self.activeSaved = False
+        self.writeBufferSize = writeBufferSize
+        self.writeBuffer = bytearray()
+        self.encodeBuffer = bytearray()
+        self.dataFile = None
+        self.fileSize = 0
+        self.offsetsFile = None
+        self.offsetsBuffer = bytearray()
+        self.dataMap = None
+        self.dataView = None
+        self.liveScans = weakref.WeakSet()
         if not os.path.isdir(files.baseDir):
             os.makedirs(files.baseDir, exist_ok=True)
 
     def create(self):
+        self._endScans()
+        self.writeBuffer = bytearray()
+        self.offsetsBuffer = bytearray()
+        self._closeDataFile()
         with open(self.files.schemaPath(), 'w', encoding='utf-8') as f:
             json.dump(self.schema.toDict(), f, ensure_ascii=False)
-        open(self.files.dataPath(), 'wb').close()
-        self.rowOffsets = []
-        self.rowLengths = []
+        self._resetDataFile()
+        open(self.files.offsetsPath(), 'wb').close()
+        self.rowOffsets = array('Q')
+        self.rowLengths = array('I')
+        self.activeRows = RowBitmap()
+        self.liveRows = 0
+        self.fileSize = 0
+        self._writeActiveFile()
 
     def open(self):
+        self._closeDataFile()
         size = 0
         if os.path.isfile(self.files.dataPath()):
             size = os.path.getsize(self.files.dataPath())
-        self.rowOffsets = []
-        self.rowLengths = []
-        with open(self.files.dataPath(), 'rb') as f:
-            pos = 0
-            while pos < size:
-                f.seek(pos)
-                header = f.read(BASE_FIXED_HEADER)
-                if len(header) < BASE_FIXED_HEADER:
-                    break
-                total_len = struct.unpack('<I', header[1:5])[0]
-                if total_len <= BASE_FIXED_HEADER:
-                    break
-                self.rowOffsets.append(pos)
-                self.rowLengths.append(total_len)
-                pos += total_len
+        self.fileSize = size
+        offsets = self._readOffsetsFile()
+        if offsets is None or not self._offsetsMatchData(offsets):
+            offsets = self._scanRowOffsets()
+            self._writeOffsetsFile(offsets)
+        ends = offsets[1:]
+        ends.append(self.fileSize)
+        self.rowOffsets = offsets
+        self.rowLengths = array('I', map(operator.sub, ends, offsets))
+        self._loadActiveRows(offsets)
         for col in self.schema.columns:
             if col.get('index'):
                 p = self.files.indexPath(col['name'])
@@ -61,153 +97,438 @@ class TableEngine:
                         self.indexes[col['name']] = IntIndex(p)
                     else:
                         self.indexes[col['name']] = StrIndex(p)
+        for col in self.schema.columns:
+            if col['type'] != 'VARCHAR':
+                continue
+            for kind, indexClass, pathName in TEXT_INDEX_KINDS:
+                if not col.get(kind):
+                    continue
+                p = getattr(self.files, pathName)(col['name'])
+                if os.path.isfile(p):
+                    self.textIndexes[kind][col['name']] = indexClass(p)
+                else:
+                    self._rebuildSingleIndex(col['name'])
+                    break
 
-    def _rebuildSingleIndex(self, colName):
-        targetIdx = -1
-        targetType = None
-        for i, c in enumerate(self.schema.columns):
-            if c['name'] == colName:
-                if c['type'] in ('INT', 'VARCHAR'):
-                    targetIdx = i
-                    targetType = c['type']
+    def _scanRowOffsets(self):
+        offsets = array('Q')
+        f = self._getDataFile()
+        pos = 0
+        while pos < self.fileSize:
+            f.seek(pos)
+            header = f.read(BASE_FIXED_HEADER)
+            if len(header) < BASE_FIXED_HEADER:
+                break
+            total_len = struct.unpack('<I', header[1:5])[0]
+            if total_len <= BASE_FIXED_HEADER or pos + total_len > self.fileSize:
                 break
+            offsets.append(pos)
+            pos += total_len
+        if pos < self.fileSize:
+            f.truncate(pos)
+            self.fileSize = pos
+        return offsets
+
+    def _readOffsetsFile(self):
+        path = self.files.offsetsPath()
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'rb') as f:
+            raw = f.read()
+        if len(raw) % 8 != 0:
+            return None
+        offsets = array('Q')
+        offsets.frombytes(raw)
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+        return offsets
+
+    def _writeOffsetsFile(self, offsets):
+        self._closeOffsetsFile()
+        data = array('Q', offsets)
+        if sys.byteorder != 'little':
+            data.byteswap()
+        with open(self.files.offsetsPath(), 'wb') as f:
+            f.write(data.tobytes())
+
+    def _offsetsMatchData(self, offsets):
+        if len(offsets) == 0:
+            return self.fileSize == 0
+        if offsets[0] != 0:
+            return False
+        last = offsets[-1]
+        if last + BASE_FIXED_HEADER > self.fileSize:
+            return False
+        f = self._getDataFile()
+        f.seek(last)
+        header = f.read(BASE_FIXED_HEADER)
+        total_len = struct.unpack('<I', header[1:5])[0]
+        return total_len > BASE_FIXED_HEADER and last + total_len == self.fileSize
+
+    def _loadActiveRows(self, offsets):
+        saved = self._readActiveFile(offsets)
+        if saved is not None and saved[0].size == len(offsets):
+            self.activeRows, self.liveRows = saved
+            self.activeSaved = True
+            return
+        view = self._getDataView()
+        if saved is None:
+            self.activeRows = RowBitmap.fromFlags(bytes(map(view.__getitem__, offsets)))
+            self.liveRows = self.activeRows.count()
+        else:
+            self.activeRows, self.liveRows = saved
+            for off in offsets[self.activeRows.size:]:
+                flag = view[off]
+                self.activeRows.append(flag)
+                self.liveRows += flag
+        self._writeActiveFile()
+
+    def _readActiveFile(self, offsets):
+        path = self.files.activePath()
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'rb') as f:
+            raw = f.read()
+        if len(raw) < BITMAP_HEADER.size:
+            return None
+        magic, size, dataSize, live = BITMAP_HEADER.unpack_from(raw, 0)
+        bits = raw[BITMAP_HEADER.size:]
+        if magic != BITMAP_MAGIC or size > len(offsets) or len(bits) != (size + 7) >> 3:
+            return None
+        end = self.fileSize if size == len(offsets) else offsets[size]
+        if dataSize != end:
+            return None
+        return RowBitmap.fromBytes(bits, size), live
+
+    def _writeActiveFile(self):
+        path = self.files.activePath()
+        tmpPath = path + '.tmp'
+        with open(tmpPath, 'wb') as f:
+            f.write(BITMAP_HEADER.pack(BITMAP_MAGIC, self.activeRows.size, self.fileSize, self.liveRows))
+            f.write(self.activeRows.bits)
+        os.replace(tmpPath, path)
+        self.activeSaved = True
+
+    def _dropActiveFile(self):
+        if not self.activeSaved:
+            return
+        path = self.files.activePath()
+        if os.path.isfile(path):
+            os.remove(path)
+        self.activeSaved = False
+
+    def _closeOffsetsFile(self):
+        if self.offsetsFile is not None:
+            self.offsetsFile.close()
+            self.offsetsFile = None
+
+    def _rebuildSingleIndex(self, colName):
+        targetIdx = self.schema.columnIndex(colName)
         if targetIdx < 0:
             return
-        path = self.files.indexPath(colName)
-        idx = IntIndex(path) if targetType == 'INT' else StrIndex(path)
+        targetType = self.schema.types[targetIdx]
+        if targetType not in ('INT', 'VARCHAR'):
+            return
+        col = self.schema.columns[targetIdx]
+        textBuilds = []
+        if targetType == 'VARCHAR':
+            for kind, indexClass, pathName in TEXT_INDEX_KINDS:
+                if col.get(kind):
+                    textIdx = indexClass(getattr(self.files, pathName)(colName))
+                    textIdx.clear()
+                    textBuilds.append((kind, textIdx))
+        idx = None
+        if col.get('index') or not textBuilds:
+            path = self.files.indexPath(colName)
+            idx = IntIndex(path) if targetType == 'INT' else StrIndex(path)
+            idx.clear()
+        textPairs = []
+        readValue = self.schema.decoder.reader(targetIdx)
+        view = self._getDataView()
         total = self.rowCount()
+        bits = self.activeRows.bits
         for rid in range(total):
-            if self._isRowActive(rid):
-                data = self._readRowBytes(rid)
-                val = self._readColumnValueRaw(data, targetIdx)
-                if val is not None:
-                    if targetType == 'INT':
-                        idx.add(int(val), rid)
-                    else:
-                        idx.add(str(val), rid)
-        idx.save()
-        self.indexes[colName] = idx
+            if not (bits[rid >> 3] >> (rid & 7)) & 1:
+                continue
+            off = self.rowOffsets[rid]
+            data = view[off:off + self.rowLengths[rid]]
+            val = readValue(data)
+            if val is not None:
+                if textBuilds:
+                    textPairs.append((str(val), rid))
+                if idx is None:
+                    continue
+                if targetType == 'INT':
+                    idx.add(int(val), rid)
+                else:
+                    idx.add(str(val), rid)
+        if idx is not None:
+            idx.save()
+            self.indexes[colName] = idx
+        for kind, textIdx in textBuilds:
+            textIdx.addMany(textPairs)
+            textIdx.save()
+            self.textIndexes[kind][colName] = textIdx
 
     def close(self):
+        self._endScans()
+        self._closeDataFile()
+        self._saveIndexes(True)
+        self._writeActiveFile()
+
+    def _saveIndexes(self, compact):
         for name in self.indexes:
-            self.indexes[name].save()
+            self.indexes[name].save(compact)
+        for name, textIdx in self._textIndexItems():
+            textIdx.save(compact)
+
+    def _textIndexItems(self):
+        for kind in self.textIndexes:
+            for name, textIdx in self.textIndexes[kind].items():
+                yield name, textIdx
+
+    def _getDataFile(self):
+        if self.dataFile is None:
+            path = self.files.dataPath()
+            if not os.path.isfile(path):
+                open(path, 'wb').close()
+            self.dataFile = open(path, 'r+b')
+        return self.dataFile
+
+    def _closeDataFile(self):
+        self.flush()
+        self._releaseDataView()
+        self._closeOffsetsFile()
+        if self.dataFile is None:
+            return
+        self.dataFile.close()
+        self.dataFile = None
+
+    def flush(self):
+        if len(self.writeBuffer) > 0:
+            f = self._getDataFile()
+            f.seek(self.fileSize)
+            f.write(self.writeBuffer)
+            f.flush()
+            self.fileSize += len(self.writeBuffer)
+            self.writeBuffer = bytearray()
+            if self.offsetsFile is None:
+                self.offsetsFile = open(self.files.offsetsPath(), 'ab')
+            self.offsetsFile.write(self.offsetsBuffer)
+            self.offsetsFile.flush()
+            self.offsetsBuffer = bytearray()
+        self._saveIndexes(False)
+
+    def _getDataView(self):
+        self.flush()
+        f = self._getDataFile()
+        f.flush()
+        if self.dataView is not None and len(self.dataView) == self.fileSize:
+            return self.dataView
+        self._releaseDataView()
+        if self.fileSize == 0:
+            return memoryview(b'')
+        self.dataMap = mmap.mmap(f.fileno(), self.fileSize, access=mmap.ACCESS_READ)
+        self.dataView = memoryview(self.dataMap)
+        return self.dataView
+
+    def _releaseDataView(self):
+        self.dataView = None
+        self.dataMap = None
+
+    def _track(self, rows):
+        self.liveScans.add(rows)
+        return rows
+
+    def _endScans(self):
+        for rows in list(self.liveScans):
+            rows.close()
+        self.liveScans = weakref.WeakSet()
+        view = self.dataView
+        dataMap = self.dataMap
+        self._releaseDataView()
+        if dataMap is None:
+            return
+        view.release()
+        try:
+            dataMap.close()
+        except BufferError:
+            raise ValueError('data file is still mapped by an open reader: ' + self.files.dataPath())
+
+    def _resetDataFile(self):
+        path = self.files.dataPath()
+        tmpPath = path + '.tmp'
+        open(tmpPath, 'wb').close()
+        os.replace(tmpPath, path)
 
     def rowCount(self):
         return len(self.rowOffsets)
 
+    def liveRowCount(self):
+        return self.liveRows
+
     def _isRowActive(self, rowId):
-        if rowId < 0 or rowId >= self.rowCount():
-            return False
-        off = self.rowOffsets[rowId]
-        with open(self.files.dataPath(), 'rb') as f:
-            f.seek(off)
-            b = f.read(1)
-            if len(b) < 1:
-                return False
-            return b[0] == 1
+        return self.activeRows.isSet(rowId)
 
-    def _setRowInactive(self, rowId):
-        if rowId < 0 or rowId >= self.rowCount():
-            return
-        off = self.rowOffsets[rowId]
-        with open(self.files.dataPath(), 'r+b') as f:
+    def _setRowsInactive(self, rowIds):
+        active = self.activeRows
+        rowIds = [rid for rid in rowIds if active.isSet(rid)]
+        if not rowIds:
+            return 0
+        self._dropActiveFile()
+        self._unindexRows(rowIds)
+        f = None
+        for rid in rowIds:
+            active.clear(rid)
+            off = self.rowOffsets[rid]
+            if off >= self.fileSize:
+                self.writeBuffer[off - self.fileSize] = 0
+                continue
+            if f is None:
+                f = self._getDataFile()
             f.seek(off)
             f.write(b'\x00')
+        if f is not None:
+            f.flush()
+        self.liveRows -= len(rowIds)
+        self.flush()
+        return len(rowIds)
+
+    def _unindexRows(self, rowIds):
+        targets = []
+        for name, idx in self.indexes.items():
+            colIdx = self.schema.columnIndex(name)
+            if colIdx >= 0:
+                targets.append((idx, self.schema.decoder.reader(colIdx)))
+        for name, textIdx in self._textIndexItems():
+            targets.append((textIdx, self.schema.decoder.reader(self.schema.columnIndex(name))))
+        if not targets:
+            return
+        rows = [self._readRowBytes(rid) for rid in rowIds]
+        for idx, readValue in targets:
+            byKey = {}
+            for rid, data in zip(rowIds, rows):
+                key = readValue(data)
+                ids = byKey.get(key)
+                if ids is None:
+                    ids = set()
+                    byKey[key] = ids
+                ids.add(rid)
+            for key, ids in byKey.items():
+                idx.removeRowIds(key, ids)
 
     def _readRowBytes(self, rowId):
         if rowId < 0 or rowId >= self.rowCount():
             return None
         off = self.rowOffsets[rowId]
         length = self.rowLengths[rowId]
-        with open(self.files.dataPath(), 'rb') as f:
-            f.seek(off)
-            data = f.read(length)
-            if len(data) < length:
-                return None
-            return data
-
-    def _readHeader(self, data):
-        if len(data) < BASE_FIXED_HEADER:
-            return None, None, None
-        active = data[0]
-        total_len = struct.unpack('<I', data[1:5])[0]
-        count = struct.unpack('<H', data[5:7])[0]
-        return active, total_len, count
-
-    def _columnDirOffset(self, colIndex):
-        return BASE_FIXED_HEADER + colIndex * 4
-
-    def _getValueOffset(self, data, colIndex):
-        start = self._columnDirOffset(colIndex)
-        return struct.unpack('<I', data[start:start+4])[0]
-
-    def _readColumnValueRaw(self, data, colIndex):
-        active, total_len, count = self._readHeader(data)
-        if active is None or colIndex >= count:
+        if off >= self.fileSize:
+            start = off - self.fileSize
+            return bytes(self.writeBuffer[start:start + length])
+        f = self._getDataFile()
+        f.seek(off)
+        data = f.read(length)
+        if len(data) < length:
             return None
-        off = self._getValueOffset(data, colIndex)
-        colDef = self.schema.columns[colIndex]
-        dtype = colDef['type']
-        v, _ = unpackValue(dtype, data, off)
-        return v
+        return data
+
+    def _getEncodeBuffer(self, maxRowSize):
+        if len(self.encodeBuffer) < maxRowSize:
+            self.encodeBuffer = bytearray(max(WRITE_BUFFER_SIZE, maxRowSize))
+        return self.encodeBuffer
+
+    def _indexKey(self, col, valuesDict):
+        if col['type'] == 'INT':
+            return int(valuesDict.get(col['name']))
+        return storedText(valuesDict.get(col['name']), col.get('max'))
 
     def insertRow(self, valuesDict):
         cols = self.schema.columns
-        count = len(cols)
-        dirSize = count * 4
-        headerBaseLen = BASE_FIXED_HEADER + dirSize
-        payload = b''
-        offsets = [0] * count
-        for i, col in enumerate(cols):
-            name = col['name']
-            ctype = col['type']
-            cmax = col.get('max')
-            val = valuesDict.get(name)
-            packed = packValue(ctype, cmax, val)
-            offsets[i] = headerBaseLen + len(payload)
-            payload += packed
-        dirBytes = b''.join(struct.pack('<I', off) for off in offsets)
-        total_len = headerBaseLen + len(payload)
-        rowBytes = b''.join([
-            b'\x01',
-            struct.pack('<I', total_len),
-            struct.pack('<H', count),
-            dirBytes,
-            payload
-        ])
-        with open(self.files.dataPath(), 'ab') as f:
-            startOffset = f.tell()
-            f.write(rowBytes)
+        enc = self.schema.encoder
+        buf = self._getEncodeBuffer(enc.maxRowSize)
+        total_len = enc.encodeInto(buf, 0, valuesDict)
+        startOffset = self.fileSize + len(self.writeBuffer)
+        self.writeBuffer += memoryview(buf)[:total_len]
+        self.offsetsBuffer += struct.pack('<Q', startOffset)
         self.rowOffsets.append(startOffset)
         self.rowLengths.append(total_len)
+        self.activeRows.append(True)
+        self.liveRows += 1
         rowId = self.rowCount() - 1
-        for i, col in enumerate(cols):
+        for col in cols:
             if self.indexes.get(col['name']) is not None:
-                if col['type'] == 'INT':
-                    v = int(valuesDict.get(col['name']))
-                    self.indexes[col['name']].add(v, rowId)
-                else:
-                    v = '' if valuesDict.get(col['name']) is None else str(valuesDict.get(col['name']))
-                    self.indexes[col['name']].add(v, rowId)
+                self.indexes[col['name']].add(self._indexKey(col, valuesDict), rowId)
+        for name, textIdx in self._textIndexItems():
+            textIdx.add(self._indexKey(cols[self.schema.columnIndex(name)], valuesDict), rowId)
+        if len(self.writeBuffer) >= self.writeBufferSize:
+            self.flush()
         return rowId
 
+    def insertMany(self, rows):
+        rows = list(rows)
+        cols = self.schema.columns
+        firstRowId = self.rowCount()
+        enc = self.schema.encoder
+        buf = self._getEncodeBuffer(enc.maxRowSize)
+        limit = len(buf) - enc.maxRowSize
+        wb = self.writeBuffer
+        startLen = len(wb)
+        base = self.fileSize + startLen
+        offsets = array('Q')
+        lengths = array('I')
+        pos = 0
+        try:
+            for valuesDict in rows:
+                if pos > limit:
+                    wb += memoryview(buf)[:pos]
+                    pos = 0
+                end = enc.encodeInto(buf, pos, valuesDict)
+                offsets.append(base)
+                lengths.append(end - pos)
+                base += end - pos
+                pos = end
+            wb += memoryview(buf)[:pos]
+        except Exception:
+            del wb[startLen:]
+            raise
+        n = len(offsets)
+        if n == 0:
+            return range(firstRowId, firstRowId)
+        if sys.byteorder != 'little':
+            packedOffsets = array('Q', offsets)
+            packedOffsets.byteswap()
+            self.offsetsBuffer += packedOffsets.tobytes()
+        else:
+            self.offsetsBuffer += offsets.tobytes()
+        self.rowOffsets.extend(offsets)
+        self.rowLengths.extend(lengths)
+        self.activeRows.extend(n, True)
+        self.liveRows += n
+        for col in cols:
+            idx = self.indexes.get(col['name'])
+            textIdxs = [kindIndexes[col['name']] for kindIndexes in self.textIndexes.values() if col['name'] in kindIndexes]
+            if idx is None and not textIdxs:
+                continue
+            pairs = []
+            rid = firstRowId
+            for valuesDict in rows:
+                pairs.append((self._indexKey(col, valuesDict), rid))
+                rid += 1
+            for textIdx in textIdxs:
+                textIdx.addMany(pairs)
+            if idx is not None:
+                pairs.sort()
+                idx.addMany(pairs)
+        self.flush()
+        return range(firstRowId, firstRowId + n)
+
     def readColumns(self, rowId, colIndexes):
         if not self._isRowActive(rowId):
             return None
         data = self._readRowBytes(rowId)
         if data is None:
             return None
-        active, total_len, count = self._readHeader(data)
-        res = []
-        for idx in colIndexes:
-            if idx >= count:
-                res.append(None)
-                continue
-            off = self._getValueOffset(data, idx)
-            dtype = self.schema.columns[idx]['type']
-            v, _ = unpackValue(dtype, data, off)
-            res.append(v)
-        return res
+        return list(self.schema.decoder.projection(colIndexes)(data))
 
     def readRow(self, rowId):
         if not self._isRowActive(rowId):
@@ -215,116 +536,231 @@ class TableEngine:
         data = self._readRowBytes(rowId)
         if data is None:
             return None
-        active, total_len, count = self._readHeader(data)
-        res = []
-        for i in range(count):
-            off = self._getValueOffset(data, i)
-            dtype = self.schema.columns[i]['type']
-            v, _ = unpackValue(dtype, data, off)
-            res.append(v)
-        return res
+        return list(self.schema.decoder.projection(range(len(self.schema.types)))(data))
 
     def deleteAll(self):
-        open(self.files.dataPath(), 'wb').close()
-        self.rowOffsets = []
-        self.rowLengths = []
+        self._endScans()
+        self.writeBuffer = bytearray()
+        self.offsetsBuffer = bytearray()
+        self._closeDataFile()
+        self._resetDataFile()
+        open(self.files.offsetsPath(), 'wb').close()
+        self.rowOffsets = array('Q')
+        self.rowLengths = array('I')
+        self.activeRows = RowBitmap()
+        self.liveRows = 0
+        self.fileSize = 0
+        self._writeActiveFile()
         for name in list(self.indexes.keys()):
-            self.indexes[name].map = {}
+            self.indexes[name].clear()
             self.indexes[name].save()
+        for name, textIdx in self._textIndexItems():
+            textIdx.clear()
+            textIdx.save()
 
     def deleteWhere(self, colName, value):
-        colIdx = -1
-        for i, c in enumerate(self.schema.columns):
-            if c['name'] == colName:
-                colIdx = i
-                break
+        colIdx = self.schema.columnIndex(colName)
         if colIdx < 0:
             return 0
-        deleted = 0
-        col = self.schema.columns[colIdx]
-        if self.indexes.get(colName) is not None:
-            key = int(value) if col['type'] == 'INT' else str(value)
-            rowIds = self.indexes[colName].getRowIds(key)
-            s = set(rowIds)
-            for rid in rowIds:
-                if self._isRowActive(rid):
-                    self._setRowInactive(rid)
-                    deleted += 1
-            self.indexes[colName].removeRowIds(key, s)
-            return deleted
-        total = self.rowCount()
-        for rid in range(total):
-            if self._isRowActive(rid):
-                data = self._readRowBytes(rid)
-                v = self._readColumnValueRaw(data, colIdx)
-                if v is not None:
-                    match = False
-                    if col['type'] == 'INT':
-                        match = int(v) == int(value)
-                    else:
-                        match = str(v) == str(value)
-                    if match:
-                        self._setRowInactive(rid)
-                        deleted += 1
-        return deleted
+        if self.indexes.get(colName) is None:
+            return self.deleteMatching({'op': '=', 'col': colName, 'value': value})
+        key = convertValue(self.schema.types[colIdx], value)
+        return self._setRowsInactive(self.indexes[colName].getRowIds(key))
+
+    def deleteMatching(self, where):
+        pred = normalizeWhere(where)
+        matched = []
+        for rid, data in self._iterMatching(pred):
+            matched.append(rid)
+        return self._setRowsInactive(matched)
+
+    def columnIndex(self, colName):
+        return self.schema.columnIndex(colName)
 
-    def select(self, colNames, where):
+    def resolveColumns(self, colNames):
         selIdx = []
         if colNames == ['*']:
-            for i in range(len(self.schema.columns)):
-                selIdx.append(i)
+            selIdx = list(range(len(self.schema.types)))
         else:
             for name in colNames:
-                for j, c in enumerate(self.schema.columns):
-                    if c['name'] == name:
-                        selIdx.append(j)
-                        break
-        rowIds = None
-        if where is not None:
-            wcol, wval = where[0], where[1]
-            idx = -1
-            for i, c in enumerate(self.schema.columns):
-                if c['name'] == wcol:
-                    idx = i
+                j = self.schema.columnIndex(name)
+                if j >= 0:
+                    selIdx.append(j)
+        return selIdx
+
+    def select(self, colNames, where, orderBy=None, limit=None):
+        return self.selectWhere(self.resolveColumns(colNames), normalizeWhere(where), orderBy, limit)
+
+    def selectWhere(self, selIdx, pred, orderBy=None, limit=None):
+        return list(self.iterSelect(selIdx, pred, orderBy, limit))
+
+    def iterSelect(self, selIdx, pred, orderBy=None, limit=None):
+        project = self.schema.decoder.projection(selIdx)
+        if orderBy is None:
+            return limitRows(self._track(project(data) for rid, data in self._iterMatching(pred)), limit)
+        colIdx = self.schema.columnIndex(orderBy['col'])
+        if colIdx < 0:
+            raise ValueError('unknown ORDER BY column: ' + orderBy['col'])
+        desc = orderBy['desc']
+        rowIds, exact = (None, True) if pred is None else self._planRowIds(pred)
+        idx = self.indexes.get(orderBy['col'])
+        if rowIds is None and idx is not None:
+            return limitRows(self._track(project(data) for rid, data in self._iterIndexOrder(idx, pred, desc)), limit)
+        read = self.schema.decoder.reader(colIdx)
+        keyed = ((read(data), data) for rid, data in self._iterPlanned(pred, rowIds, exact))
+        ordered = [project(data) for key, data in topRows(keyed, operator.itemgetter(0), desc, limit)]
+        return self._track(row for row in ordered)
+
+    def countWhere(self, pred):
+        if pred is None:
+            return self.liveRowCount()
+        op = pred['op']
+        if op != '=' and op != 'in':
+            return None
+        colIdx = self.schema.columnIndex(pred['col'])
+        idx = self.indexes.get(pred['col'])
+        if colIdx < 0 or idx is None:
+            return None
+        colType = self.schema.types[colIdx]
+        if op == '=':
+            keys = [convertValue(colType, pred['value'])]
+        else:
+            keys = set(convertValue(colType, v) for v in pred['values'])
+        return sum(idx.postingCount(key) for key in keys)
+
+    def aggregate(self, items, groupBy, where, orderBy=None, limit=None):
+        plan = AggregatePlan(items, groupBy)
+        pred = normalizeWhere(where)
+        if plan.countOnly():
+            n = self.countWhere(pred)
+            if n is not None:
+                return plan.fromCount(n, orderBy, limit)
+        selIdx = self.resolveColumns(plan.inputs)
+        if len(selIdx) != len(plan.inputs):
+            return []
+        plan.checkTypes([self.schema.types[i] for i in selIdx])
+        project = self.schema.decoder.projection(selIdx)
+        return plan.run((project(data) for rid, data in self._iterMatching(pred)), orderBy, limit)
+
+    def _planRowIds(self, pred):
+        op = pred['op']
+        if op == 'and':
+            lists = []
+            exact = True
+            for p in pred['args']:
+                ids, ex = self._planRowIds(p)
+                if ids is None:
+                    exact = False
+                    continue
+                exact = exact and ex
+                lists.append(ids)
+            if not lists:
+                return None, False
+            lists.sort(key=len)
+            best = lists[0]
+            for ids in lists[1:]:
+                if not best:
                     break
-            if idx >= 0:
-                col = self.schema.columns[idx]
-                if self.indexes.get(wcol) is not None:
-                    key = int(wval) if col['type'] == 'INT' else str(wval)
-                    rowIds = self.indexes[wcol].getRowIds(key)
-        res = []
+                best = intersectSorted(best, ids)
+            return best, exact
+        if op == 'or':
+            lists = []
+            exact = True
+            for p in pred['args']:
+                ids, ex = self._planRowIds(p)
+                if ids is None:
+                    return None, False
+                exact = exact and ex
+                lists.append(ids)
+            return unionSorted(lists), exact
+        colIdx = self.schema.columnIndex(pred['col'])
+        if colIdx < 0:
+            return [], True
+        idx = self.indexes.get(pred['col'])
+        colType = self.schema.types[colIdx]
+        if op == 'like':
+            return self._planLike(idx, pred['col'], colType, str(pred['value']))
+        if op == 'match':
+            fts = self.fulltextIndexes.get(pred['col'])
+            if fts is None:
+                return None, False
+            return fts.search(str(pred['value'])), True
+        if idx is None:
+            return None, False
+        if op == '=':
+            return idx.getRowIds(convertValue(colType, pred['value'])), True
+        if op == 'in':
+            keys = set(convertValue(colType, v) for v in pred['values'])
+            return unionSorted([idx.getRowIds(key) for key in keys]), True
+        if op == '!=' or not hasattr(idx, 'rangeRowIds'):
+            return None, False
+        if op == 'between':
+            return sorted(idx.rangeRowIds(convertValue(colType, pred['low']), convertValue(colType, pred['high']))), True
+        key = convertValue(colType, pred['value'])
+        if op == '<':
+            return sorted(idx.rangeRowIds(None, key, True, False)), True
+        if op == '<=':
+            return sorted(idx.rangeRowIds(None, key)), True
+        if op == '>':
+            return sorted(idx.rangeRowIds(key, None, False, True)), True
+        return sorted(idx.rangeRowIds(key, None)), True
+
+    def _planLike(self, idx, colName, colType, pattern):
+        prefix = likePrefix(pattern)
+        if idx is not None and colType == 'VARCHAR' and prefix and hasattr(idx, 'prefixRowIds'):
+            if prefix == pattern:
+                return idx.getRowIds(prefix), True
+            return sorted(idx.prefixRowIds(prefix)), pattern == prefix + '%'
+        tri = self.trigramIndexes.get(colName)
+        if tri is not None:
+            ids = tri.candidateRowIds(pattern)
+            if ids is not None:
+                return ids, False
+        return None, False
+
+    def _iterIndexOrder(self, idx, pred, desc):
+        view = self._getDataView()
+        offsets = self.rowOffsets
+        lengths = self.rowLengths
+        bits = self.activeRows.bits
+        matches = None if pred is None else compileMatcher(pred, self.schema)
+        for key, rowIds in idx.orderedItems(desc):
+            for rid in rowIds:
+                if (bits[rid >> 3] >> (rid & 7)) & 1:
+                    off = offsets[rid]
+                    data = view[off:off + lengths[rid]]
+                    if matches is None or matches(data):
+                        yield rid, data
+
+    def _iterMatching(self, pred):
+        if pred is None:
+            return self._iterPlanned(None, None, True)
+        rowIds, exact = self._planRowIds(pred)
+        return self._iterPlanned(pred, rowIds, exact)
+
+    def _iterPlanned(self, pred, rowIds, exact):
+        view = self._getDataView()
+        offsets = self.rowOffsets
+        lengths = self.rowLengths
+        bits = self.activeRows.bits
+        if pred is None:
+            for rid in range(self.rowCount()):
+                if (bits[rid >> 3] >> (rid & 7)) & 1:
+                    off = offsets[rid]
+                    yield rid, view[off:off + lengths[rid]]
+            return
+        matches = None if exact else compileMatcher(pred, self.schema)
         if rowIds is not None:
             for rid in rowIds:
-                if self._isRowActive(rid):
-                    vals = self.readColumns(rid, selIdx)
-                    if vals is not None:
-                        res.append(tuple(vals))
-            return res
-        total = self.rowCount()
-        for rid in range(total):
-            if self._isRowActive(rid):
-                if where is None:
-                    vals = self.readColumns(rid, selIdx)
-                    if vals is not None:
-                        res.append(tuple(vals))
-                else:
-                    wcol, wval = where[0], where[1]
-                    idx = -1
-                    for i, c in enumerate(self.schema.columns):
-                        if c['name'] == wcol:
-                            idx = i
-                            break
-                    if idx >= 0:
-                        data = self._readRowBytes(rid)
-                        v = self._readColumnValueRaw(data, idx)
-                        ok = False
-                        colType = self.schema.columns[idx]['type']
-                        if colType == 'INT':
-                            ok = int(v) == int(wval)
-                        else:
-                            ok = str(v) == str(wval)
-                        if ok:
-                            vals = self.readColumns(rid, selIdx)
-                            if vals is not None:
-                                res.append(tuple(vals))
-        return res
+                if (bits[rid >> 3] >> (rid & 7)) & 1:
+                    off = offsets[rid]
+                    data = view[off:off + lengths[rid]]
+                    if matches is None or matches(data):
+                        yield rid, data
+            return
+        for rid in range(self.rowCount()):
+            if (bits[rid >> 3] >> (rid & 7)) & 1:
+                off = offsets[rid]
+                data = view[off:off + lengths[rid]]
+                if matches(data):
+                    yield rid, data
@@ -1,3 +1,5 @@
 from .intIndex import IntIndex
 from .strIndex import StrIndex
-__all__ = ['IntIndex','StrIndex']
+from .trigramIndex import TrigramIndex
+from .fulltextIndex import FullTextIndex
+__all__ = ['IntIndex','StrIndex','TrigramIndex','FullTextIndex']
@@ -0,0 +1,202 @@
+import os
+import re
+import struct
+from bisect import insort
+from .indexLog import IndexLog, OP_ADD
+from ..constants import INDEX_TOMBSTONE_LIMIT
+from .postings import encodePostings, decodePostings, intersectSorted, unionSorted
+
+FULLTEXT_MAGIC = b'SDFT'
+FULLTEXT_HEADER = struct.Struct('<4sQ')
+TERM_HEADER = struct.Struct('<III')
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def parseMatchQuery(query):
+    groups = []
+    for part in query.split('|'):
+        terms = tokenize(part)
+        if terms:
+            groups.append(terms)
+    return groups
+
+
+def encodeTerm(term):
+    return term.encode('utf-8')
+
+
+class FullTextIndex:
+    def __init__(self, path):
+        self.path = path
+        self.encoded = {}
+        self.map = {}
+        self.tombstones = {}
+        self.tombstoneCount = 0
+        self.log = IndexLog(path)
+        data = b''
+        hasBase = os.path.isfile(self.path)
+        if hasBase:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        total = self._loadBase(data)
+        for op, termBytes, rid in self.log.load(data, total, hasBase):
+            term = str(termBytes, 'utf-8', 'ignore')
+            if op == OP_ADD:
+                self._append(self._materialize(term), rid)
+            else:
+                self._tombstone(term, rid)
+        if self.tombstoneCount:
+            self.purge()
+    def _loadBase(self, data):
+        if len(data) < FULLTEXT_HEADER.size or not data.startswith(FULLTEXT_MAGIC):
+            return 0
+        count = FULLTEXT_HEADER.unpack_from(data, 0)[1]
+        pos = FULLTEXT_HEADER.size
+        n = len(data)
+        total = 0
+        i = 0
+        while i < count and pos + TERM_HEADER.size <= n:
+            termLen, idCount, byteLen = TERM_HEADER.unpack_from(data, pos)
+            pos = pos + TERM_HEADER.size
+            if pos + termLen + byteLen > n:
+                break
+            term = str(data[pos:pos + termLen], 'utf-8', 'ignore')
+            pos = pos + termLen
+            self.encoded[term] = (idCount, data[pos:pos + byteLen])
+            pos = pos + byteLen
+            total = total + idCount
+            i = i + 1
+        return total
+    def _append(self, arr, rid):
+        if not arr or arr[-1] < rid:
+            arr.append(rid)
+        elif rid not in arr:
+            insort(arr, rid)
+    def _materialize(self, term):
+        arr = self.map.get(term)
+        if arr is None:
+            entry = self.encoded.get(term)
+            arr = [] if entry is None else decodePostings(entry[1])
+            self.map[term] = arr
+        return arr
+    def _postings(self, term):
+        arr = self.map.get(term)
+        if arr is None:
+            entry = self.encoded.get(term)
+            if entry is None:
+                return []
+            arr = decodePostings(entry[1])
+        dead = self.tombstones.get(term)
+        if dead:
+            return [rid for rid in arr if rid not in dead]
+        return arr
+    def postingCount(self, term):
+        if term in self.tombstones:
+            return len(self._postings(term))
+        arr = self.map.get(term)
+        if arr is not None:
+            return len(arr)
+        entry = self.encoded.get(term)
+        return 0 if entry is None else entry[0]
+    def add(self, text, rowId):
+        for term in set(tokenize(text)):
+            self._append(self._materialize(term), rowId)
+            self.log.add(term, rowId)
+    def addMany(self, pairs):
+        byTerm = {}
+        termPairs = []
+        for text, rid in pairs:
+            for term in set(tokenize(text)):
+                ids = byTerm.get(term)
+                if ids is None:
+                    ids = []
+                    byTerm[term] = ids
+                ids.append(rid)
+                termPairs.append((term, rid))
+        for term, ids in byTerm.items():
+            ids.sort()
+            arr = self._materialize(term)
+            if arr and arr[-1] >= ids[0]:
+                arr.extend(ids)
+                arr.sort()
+            else:
+                arr.extend(ids)
+        self.log.addMany(termPairs)
+    def _tombstone(self, term, rowId):
+        dead = self.tombstones.get(term)
+        if dead is None:
+            dead = set()
+            self.tombstones[term] = dead
+        if rowId in dead:
+            return False
+        dead.add(rowId)
+        self.tombstoneCount = self.tombstoneCount + 1
+        return True
+    def removeRowIds(self, text, rowIdsSet):
+        for term in set(tokenize(text)):
+            if term not in self.map and term not in self.encoded:
+                continue
+            for rid in rowIdsSet:
+                if self._tombstone(term, rid):
+                    self.log.remove(term, rid)
+        if self.tombstoneCount > INDEX_TOMBSTONE_LIMIT:
+            self.purge()
+    def purge(self):
+        for term, dead in self.tombstones.items():
+            arr = self._materialize(term)
+            self.map[term] = [rid for rid in arr if rid not in dead]
+        self.tombstones = {}
+        self.tombstoneCount = 0
+    def termRowIds(self, term):
+        return list(self._postings(term))
+    def search(self, query):
+        groups = []
+        for terms in parseMatchQuery(query):
+            ordered = sorted(set(terms), key=self.postingCount)
+            res = self._postings(ordered[0])
+            for term in ordered[1:]:
+                if not res:
+                    break
+                res = intersectSorted(res, self._postings(term))
+            groups.append(res)
+        if len(groups) == 1:
+            return list(groups[0])
+        return unionSorted(groups)
+    def clear(self):
+        self.encoded = {}
+        self.map = {}
+        self.tombstones = {}
+        self.tombstoneCount = 0
+        self.log.markRewrite()
+    def save(self, compact=True):
+        if not self.log.mustCompact(compact):
+            self.log.flush(encodeTerm)
+            return
+        self.purge()
+        terms = set(self.encoded)
+        terms.update(self.map)
+        parts = []
+        encoded = {}
+        total = 0
+        for term in sorted(terms):
+            arr = self.map.get(term)
+            if arr is None:
+                entry = self.encoded[term]
+            else:
+                entry = (len(arr), encodePostings(arr))
+            if entry[0] == 0:
+                continue
+            termBytes = encodeTerm(term)
+            parts.append(TERM_HEADER.pack(len(termBytes), entry[0], len(entry[1])))
+            parts.append(termBytes)
+            parts.append(entry[1])
+            encoded[term] = entry
+            total = total + entry[0]
+        data = FULLTEXT_HEADER.pack(FULLTEXT_MAGIC, len(encoded)) + b''.join(parts)
+        self.log.compact(data, total)
+        self.encoded = encoded
+        self.map = {}
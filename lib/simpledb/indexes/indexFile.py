@@ -0,0 +1,26 @@
+import struct
+import sys
+from array import array
+
+INT_INDEX_MAGIC = b'SDI2'
+STR_INDEX_MAGIC = b'SDS2'
+INT_INDEX_HEADER = struct.Struct('<4sQ')
+STR_INDEX_HEADER = struct.Struct('<4sQQ')
+
+
+def readArray(data, pos, count):
+    end = pos + count * 8
+    if end > len(data):
+        raise ValueError('index file is truncated')
+    arr = array('Q')
+    arr.frombytes(memoryview(data)[pos:end])
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    return arr, end
+
+
+def arrayBytes(arr):
+    if sys.byteorder != 'little':
+        arr = array('Q', arr)
+        arr.byteswap()
+    return arr.tobytes()
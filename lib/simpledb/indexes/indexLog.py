@@ -0,0 +1,118 @@
+import os
+import struct
+import zlib
+from ..constants import INDEX_LOG_MIN_RECORDS
+
+LOG_MAGIC = b'SDIL'
+LOG_HEADER = struct.Struct('<4sI')
+LOG_RECORD = struct.Struct('<BQI')
+OP_ADD = 1
+OP_REMOVE = 2
+
+
+def baseChecksum(data):
+    return zlib.crc32(data) & 0xffffffff
+
+
+class IndexLog:
+    def __init__(self, indexPath):
+        self.indexPath = indexPath
+        self.path = indexPath + '.log'
+        self.pending = []
+        self.records = 0
+        self.baseIds = 0
+        self.baseCrc = baseChecksum(b'')
+        self.rewrite = True
+        self.due = False
+
+    def load(self, baseData, baseIds, hasBase):
+        self.baseCrc = baseChecksum(baseData)
+        self.baseIds = baseIds
+        self.rewrite = not hasBase
+        self.due = False
+        self.pending = []
+        self.records = 0
+        if not os.path.isfile(self.path):
+            return []
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        if len(data) < LOG_HEADER.size:
+            self.discard()
+            return []
+        magic, crc = LOG_HEADER.unpack_from(data, 0)
+        if magic != LOG_MAGIC or crc != self.baseCrc:
+            self.discard()
+            return []
+        entries = []
+        pos = LOG_HEADER.size
+        n = len(data)
+        while pos + LOG_RECORD.size <= n:
+            op, rid, klen = LOG_RECORD.unpack_from(data, pos)
+            start = pos + LOG_RECORD.size
+            if start + klen > n or op not in (OP_ADD, OP_REMOVE):
+                break
+            entries.append((op, data[start:start + klen], rid))
+            pos = start + klen
+        if pos < n:
+            with open(self.path, 'r+b') as f:
+                f.truncate(pos)
+        self.records = len(entries)
+        return entries
+
+    def _checkSize(self):
+        if self.records + len(self.pending) > max(INDEX_LOG_MIN_RECORDS, self.baseIds):
+            self.due = True
+
+    def mustCompact(self, compact):
+        return self.rewrite or (compact and self.due)
+
+    def markRewrite(self):
+        self.rewrite = True
+        self.pending = []
+
+    def add(self, key, rowId):
+        if not self.rewrite:
+            self.pending.append((OP_ADD, key, rowId))
+            self._checkSize()
+
+    def addMany(self, sortedPairs):
+        if not self.rewrite:
+            self.pending.extend((OP_ADD, key, rid) for key, rid in sortedPairs)
+            self._checkSize()
+
+    def remove(self, key, rowId):
+        if not self.rewrite:
+            self.pending.append((OP_REMOVE, key, rowId))
+            self._checkSize()
+
+    def flush(self, encodeKey):
+        if not self.pending:
+            return
+        buf = bytearray()
+        if not os.path.isfile(self.path):
+            buf += LOG_HEADER.pack(LOG_MAGIC, self.baseCrc)
+        for op, key, rid in self.pending:
+            keyBytes = encodeKey(key)
+            buf += LOG_RECORD.pack(op, rid, len(keyBytes))
+            buf += keyBytes
+        with open(self.path, 'ab') as f:
+            f.write(buf)
+        self.records = self.records + len(self.pending)
+        self.pending = []
+
+    def compact(self, baseData, baseIds):
+        tmpPath = self.indexPath + '.tmp'
+        with open(tmpPath, 'wb') as f:
+            f.write(baseData)
+        os.replace(tmpPath, self.indexPath)
+        self.discard()
+        self.baseCrc = baseChecksum(baseData)
+        self.baseIds = baseIds
+        self.rewrite = False
+        self.due = False
+
+    def discard(self):
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+        self.records = 0
+        self.pending = []
@@ -1,71 +1,210 @@
 import os
 import struct
+from array import array
+from itertools import groupby
+from operator import itemgetter
+from bisect import bisect_left, bisect_right, insort
+from .indexLog import IndexLog, OP_ADD
+from ..constants import INDEX_TOMBSTONE_LIMIT
+from .indexFile import INT_INDEX_MAGIC, INT_INDEX_HEADER, readArray, arrayBytes
+from .postings import PostingBlock
+
+KEY_STRUCT = struct.Struct('<Q')
+COUNT_STRUCT = struct.Struct('<I')
+ENTRY_STRUCT = struct.Struct('<QI')
 
 class IntIndex:
     def __init__(self, path):
         self.path = path
         self.map = {}
-        if os.path.isfile(self.path):
+        self.tombstones = {}
+        self.tombstoneCount = 0
+        self.sortedKeys = None
+        self._setBase(array('Q'), PostingBlock())
+        self.log = IndexLog(path)
+        data = b''
+        hasBase = os.path.isfile(self.path)
+        if hasBase:
             with open(self.path, 'rb') as f:
-                data = f.read(4)
-                if len(data) == 4:
-                    count = struct.unpack('<I', data)[0]
-                    i = 0
-                    while i < count:
-                        keyBytes = f.read(8)
-                        if len(keyBytes) < 8:
-                            break
-                        key = struct.unpack('<Q', keyBytes)[0]
-                        lnBytes = f.read(4)
-                        if len(lnBytes) < 4:
-                            break
-                        ln = struct.unpack('<I', lnBytes)[0]
-                        ids = []
-                        j = 0
-                        while j < ln:
-                            idBytes = f.read(8)
-                            if len(idBytes) < 8:
-                                break
-                            rid = struct.unpack('<Q', idBytes)[0]
-                            ids.append(rid)
-                            j = j + 1
-                        self.map[key] = ids
-                        i = i + 1
-    def add(self, key, rowId):
+                data = f.read()
+        current = data.startswith(INT_INDEX_MAGIC)
+        if current:
+            self._loadBase(data)
+        else:
+            self._loadLegacy(data)
+        total = self.basePostings.total() + sum(len(ids) for ids in self.map.values())
+        for op, keyBytes, rid in self.log.load(data, total, hasBase):
+            key = KEY_STRUCT.unpack(keyBytes)[0]
+            arr = self._materialize(key)
+            if op == OP_ADD:
+                arr.append(rid)
+            else:
+                self._tombstone(key, rid)
+        if self.tombstoneCount:
+            self.purge()
+        if hasBase and not current:
+            self.log.markRewrite()
+    def _setBase(self, keys, postings):
+        self.baseKeys = keys
+        self.basePostings = postings
+    def _loadBase(self, data):
+        try:
+            magic, keyCount = INT_INDEX_HEADER.unpack_from(data, 0)
+            keys, pos = readArray(data, INT_INDEX_HEADER.size, keyCount)
+            postings, pos = PostingBlock.fromBytes(data, pos, keyCount)
+        except (ValueError, struct.error):
+            return
+        self._setBase(keys, postings)
+    def _loadLegacy(self, data):
+        if len(data) < 4:
+            return
+        count = COUNT_STRUCT.unpack_from(data, 0)[0]
+        pos = 4
+        n = len(data)
+        i = 0
+        while i < count and pos + ENTRY_STRUCT.size <= n:
+            key, ln = ENTRY_STRUCT.unpack_from(data, pos)
+            pos = pos + ENTRY_STRUCT.size
+            ln = min(ln, (n - pos) // 8)
+            self.map[key] = list(struct.unpack_from('<' + str(ln) + 'Q', data, pos))
+            pos = pos + ln * 8
+            i = i + 1
+    def _find(self, key):
+        keys = self.baseKeys
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return i
+        return -1
+    def _postings(self, key):
         arr = self.map.get(key)
         if arr is None:
+            i = self._find(key)
+            if i < 0:
+                return []
+            arr = self.basePostings.get(i)
+        dead = self.tombstones.get(key)
+        if dead:
+            return [rid for rid in arr if rid not in dead]
+        return arr
+    def _materialize(self, key, keepSorted=True):
+        arr = self.map.get(key)
+        if arr is not None:
+            return arr
+        i = self._find(key)
+        if i < 0:
             arr = []
-            self.map[key] = arr
-        arr.append(rowId)
+            if keepSorted and self.sortedKeys is not None and self.sortedKeys is not self.baseKeys:
+                insort(self.sortedKeys, key)
+            else:
+                self.sortedKeys = None
+        else:
+            arr = self.basePostings.get(i)
+        self.map[key] = arr
+        return arr
+    def _keys(self):
+        if self.sortedKeys is None:
+            extra = [key for key in self.map if self._find(key) < 0]
+            if extra:
+                merged = self.baseKeys.tolist()
+                merged.extend(extra)
+                merged.sort()
+                self.sortedKeys = merged
+            else:
+                self.sortedKeys = self.baseKeys
+        return self.sortedKeys
+    def add(self, key, rowId):
+        self._materialize(key).append(rowId)
+        self.log.add(key, rowId)
+    def addMany(self, sortedPairs):
+        for key, group in groupby(sortedPairs, itemgetter(0)):
+            self._materialize(key, False).extend([pair[1] for pair in group])
+        self.log.addMany(sortedPairs)
+    def _tombstone(self, key, rowId):
+        dead = self.tombstones.get(key)
+        if dead is None:
+            dead = set()
+            self.tombstones[key] = dead
+        if rowId in dead:
+            return False
+        dead.add(rowId)
+        self.tombstoneCount = self.tombstoneCount + 1
+        return True
     def removeRowIds(self, key, rowIdsSet):
-        arr = self.map.get(key)
-        if arr is None:
+        if key not in self.map and self._find(key) < 0:
             return
-        newArr = []
-        i = 0
-        while i < len(arr):
-            if arr[i] not in rowIdsSet:
-                newArr.append(arr[i])
-            i = i + 1
-        self.map[key] = newArr
+        for rid in rowIdsSet:
+            if self._tombstone(key, rid):
+                self.log.remove(key, rid)
+        if self.tombstoneCount > INDEX_TOMBSTONE_LIMIT:
+            self.purge()
+    def purge(self):
+        for key, dead in self.tombstones.items():
+            arr = self._materialize(key)
+            self.map[key] = [rid for rid in arr if rid not in dead]
+        self.tombstones = {}
+        self.tombstoneCount = 0
     def getRowIds(self, key):
+        return list(self._postings(key))
+    def postingCount(self, key):
+        if key in self.tombstones:
+            return len(self._postings(key))
         arr = self.map.get(key)
-        if arr is None:
-            return []
-        return list(arr)
-    def save(self):
-        items = list(self.map.items())
-        with open(self.path, 'wb') as f:
-            f.write(struct.pack('<I', len(items)))
-            i = 0
-            while i < len(items):
-                key = items[i][0]
-                ids = items[i][1]
-                f.write(struct.pack('<Q', int(key)))
-                f.write(struct.pack('<I', len(ids)))
-                j = 0
-                while j < len(ids):
-                    f.write(struct.pack('<Q', int(ids[j])))
-                    j = j + 1
+        if arr is not None:
+            return len(arr)
+        i = self._find(key)
+        return 0 if i < 0 else self.basePostings.count(i)
+    def rangeRowIds(self, low=None, high=None, lowInclusive=True, highInclusive=True):
+        keys = self._keys()
+        start = 0
+        end = len(keys)
+        if low is not None:
+            start = bisect_left(keys, low) if lowInclusive else bisect_right(keys, low)
+        if high is not None:
+            end = bisect_right(keys, high) if highInclusive else bisect_left(keys, high)
+        res = []
+        i = start
+        if not self.map and not self.tombstones and keys is self.baseKeys:
+            while i < end:
+                res.extend(self.basePostings.get(i))
                 i = i + 1
-
+            return res
+        while i < end:
+            res.extend(self._postings(keys[i]))
+            i = i + 1
+        return res
+    def orderedItems(self, reverse=False):
+        keys = self._keys()
+        order = reversed(keys) if reverse else keys
+        for key in order:
+            yield key, self._postings(key)
+    def clear(self):
+        self.map = {}
+        self.tombstones = {}
+        self.tombstoneCount = 0
+        self._setBase(array('Q'), PostingBlock())
+        self.sortedKeys = []
+        self.log.markRewrite()
+    def save(self, compact=True):
+        if not self.log.mustCompact(compact):
+            self.log.flush(KEY_STRUCT.pack)
+            return
+        keys = array('Q')
+        lists = []
+        for key in self._keys():
+            ids = self._postings(key)
+            if len(ids) == 0:
+                continue
+            keys.append(key)
+            lists.append(sorted(ids))
+        postings = PostingBlock.build(lists)
+        data = b''.join([
+            INT_INDEX_HEADER.pack(INT_INDEX_MAGIC, len(keys)),
+            arrayBytes(keys),
+            postings.toBytes()
+        ])
+        self.log.compact(data, postings.total())
+        self._setBase(keys, postings)
+        self.map = {}
+        self.tombstones = {}
+        self.tombstoneCount = 0
+        self.sortedKeys = None
@@ -0,0 +1,117 @@
+import heapq
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from .indexFile import readArray, arrayBytes
+
+
+def encodePostings(rowIds):
+    buf = bytearray()
+    prev = 0
+    for rid in rowIds:
+        delta = rid - prev
+        prev = rid
+        while delta >= 0x80:
+            buf.append((delta & 0x7f) | 0x80)
+            delta >>= 7
+        buf.append(delta)
+    return bytes(buf)
+
+
+def decodePostings(data):
+    if not data:
+        return []
+    if max(data) < 0x80:
+        return list(accumulate(data))
+    res = []
+    prev = 0
+    acc = 0
+    shift = 0
+    for b in data:
+        acc |= (b & 0x7f) << shift
+        if b & 0x80:
+            shift += 7
+        else:
+            prev += acc
+            res.append(prev)
+            acc = 0
+            shift = 0
+    return res
+
+
+def intersectSorted(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    res = []
+    if not a:
+        return res
+    if len(b) > len(a) * 8:
+        lo = 0
+        n = len(b)
+        for rid in a:
+            lo = bisect_left(b, rid, lo)
+            if lo == n:
+                break
+            if b[lo] == rid:
+                res.append(rid)
+        return res
+    i = 0
+    j = 0
+    while i < len(a) and j < len(b):
+        x = a[i]
+        y = b[j]
+        if x == y:
+            res.append(x)
+            i += 1
+            j += 1
+        elif x < y:
+            i += 1
+        else:
+            j += 1
+    return res
+
+
+def unionSorted(lists):
+    res = []
+    for rid in heapq.merge(*lists):
+        if not res or res[-1] != rid:
+            res.append(rid)
+    return res
+
+
+class PostingBlock:
+    def __init__(self, blob=b'', offsets=None, counts=None):
+        self.blob = blob
+        self.offsets = array('Q', [0]) if offsets is None else offsets
+        self.counts = array('Q') if counts is None else counts
+    def __len__(self):
+        return len(self.counts)
+    def get(self, i):
+        return decodePostings(self.blob[self.offsets[i]:self.offsets[i + 1]])
+    def count(self, i):
+        return self.counts[i]
+    def total(self):
+        return sum(self.counts)
+    def toBytes(self):
+        return arrayBytes(self.offsets) + arrayBytes(self.counts) + self.blob
+    @staticmethod
+    def build(lists):
+        parts = []
+        offsets = array('Q', [0])
+        counts = array('Q')
+        size = 0
+        for ids in lists:
+            enc = encodePostings(ids)
+            parts.append(enc)
+            size = size + len(enc)
+            offsets.append(size)
+            counts.append(len(ids))
+        return PostingBlock(b''.join(parts), offsets, counts)
+    @staticmethod
+    def fromBytes(data, pos, count):
+        offsets, pos = readArray(data, pos, count + 1)
+        counts, pos = readArray(data, pos, count)
+        end = pos + offsets[-1]
+        if end > len(data):
+            raise ValueError('posting block is truncated')
+        return PostingBlock(bytes(data[pos:end]), offsets, counts), end
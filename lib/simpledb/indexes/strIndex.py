@@ -1,77 +1,259 @@
 import os
 import struct
+from array import array
+from itertools import groupby
+from operator import itemgetter
+from bisect import bisect_left, bisect_right, insort
+from .indexLog import IndexLog, OP_ADD
+from ..constants import INDEX_TOMBSTONE_LIMIT
+from .indexFile import STR_INDEX_MAGIC, STR_INDEX_HEADER, readArray, arrayBytes
+from .postings import PostingBlock
+
+COUNT_STRUCT = struct.Struct('<I')
+
+def encodeKey(key):
+    return key.encode('utf-8')
 
 class StrIndex:
     def __init__(self, path):
         self.path = path
         self.map = {}
-        if os.path.isfile(self.path):
+        self.tombstones = {}
+        self.tombstoneCount = 0
+        self.sortedKeys = None
+        self._setBase(b'', array('Q', [0]), PostingBlock())
+        self.log = IndexLog(path)
+        data = b''
+        hasBase = os.path.isfile(self.path)
+        if hasBase:
             with open(self.path, 'rb') as f:
-                head = f.read(4)
-                if len(head) == 4:
-                    count = struct.unpack('<I', head)[0]
-                    i = 0
-                    while i < count:
-                        lnBytes = f.read(4)
-                        if len(lnBytes) < 4:
-                            break
-                        klen = struct.unpack('<I', lnBytes)[0]
-                        kbytes = f.read(klen)
-                        if len(kbytes) < klen:
-                            break
-                        key = kbytes.decode('utf-8', errors='ignore')
-                        rcountBytes = f.read(4)
-                        if len(rcountBytes) < 4:
-                            break
-                        rcount = struct.unpack('<I', rcountBytes)[0]
-                        ids = []
-                        j = 0
-                        while j < rcount:
-                            ridBytes = f.read(8)
-                            if len(ridBytes) < 8:
-                                break
-                            rid = struct.unpack('<Q', ridBytes)[0]
-                            ids.append(rid)
-                            j = j + 1
-                        self.map[key] = ids
-                        i = i + 1
-    def add(self, key, rowId):
+                data = f.read()
+        current = data.startswith(STR_INDEX_MAGIC)
+        if current:
+            self._loadBase(data)
+        else:
+            self._loadLegacy(data)
+        total = self.basePostings.total() + sum(len(ids) for ids in self.map.values())
+        for op, keyBytes, rid in self.log.load(data, total, hasBase):
+            key = str(keyBytes, 'utf-8', 'ignore')
+            arr = self._materialize(key)
+            if op == OP_ADD:
+                arr.append(rid)
+            else:
+                self._tombstone(key, rid)
+        if self.tombstoneCount:
+            self.purge()
+        if hasBase and not current:
+            self.log.markRewrite()
+    def _setBase(self, blob, keyOffsets, postings):
+        self.baseBlob = blob
+        self.baseKeyOffsets = keyOffsets
+        self.basePostings = postings
+    def _loadBase(self, data):
+        try:
+            magic, keyCount, blobLen = STR_INDEX_HEADER.unpack_from(data, 0)
+            keyOffsets, pos = readArray(data, STR_INDEX_HEADER.size, keyCount + 1)
+            if pos + blobLen > len(data):
+                return
+            blob = bytes(data[pos:pos + blobLen])
+            postings, pos = PostingBlock.fromBytes(data, pos + blobLen, keyCount)
+        except (ValueError, struct.error):
+            return
+        self._setBase(blob, keyOffsets, postings)
+    def _loadLegacy(self, data):
+        if len(data) < 4:
+            return
+        count = COUNT_STRUCT.unpack_from(data, 0)[0]
+        pos = 4
+        n = len(data)
+        i = 0
+        while i < count and pos + 4 <= n:
+            klen = COUNT_STRUCT.unpack_from(data, pos)[0]
+            pos = pos + 4
+            if pos + klen + 4 > n:
+                break
+            key = str(data[pos:pos + klen], 'utf-8', 'ignore')
+            pos = pos + klen
+            rcount = COUNT_STRUCT.unpack_from(data, pos)[0]
+            pos = pos + 4
+            rcount = min(rcount, (n - pos) // 8)
+            self.map[key] = list(struct.unpack_from('<' + str(rcount) + 'Q', data, pos))
+            pos = pos + rcount * 8
+            i = i + 1
+    def _baseKeyBytes(self, i):
+        return self.baseBlob[self.baseKeyOffsets[i]:self.baseKeyOffsets[i + 1]]
+    def _baseKeyCount(self):
+        return len(self.baseKeyOffsets) - 1
+    def _baseLowerBound(self, target):
+        lo = 0
+        hi = self._baseKeyCount()
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._baseKeyBytes(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+    def _basePrefixEnd(self, prefix, lo):
+        hi = self._baseKeyCount()
+        n = len(prefix)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._baseKeyBytes(mid)[:n] <= prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+    def _find(self, key):
+        target = encodeKey(key)
+        i = self._baseLowerBound(target)
+        if i < self._baseKeyCount() and self._baseKeyBytes(i) == target:
+            return i
+        return -1
+    def _postings(self, key):
         arr = self.map.get(key)
         if arr is None:
+            i = self._find(key)
+            if i < 0:
+                return []
+            arr = self.basePostings.get(i)
+        dead = self.tombstones.get(key)
+        if dead:
+            return [rid for rid in arr if rid not in dead]
+        return arr
+    def _materialize(self, key, keepSorted=True):
+        arr = self.map.get(key)
+        if arr is not None:
+            return arr
+        i = self._find(key)
+        if i < 0:
             arr = []
-            self.map[key] = arr
-        arr.append(rowId)
+            if keepSorted and self.sortedKeys is not None:
+                insort(self.sortedKeys, key)
+            else:
+                self.sortedKeys = None
+        else:
+            arr = self.basePostings.get(i)
+        self.map[key] = arr
+        return arr
+    def _keys(self):
+        if self.sortedKeys is None:
+            keys = set(self.map)
+            i = 0
+            while i < self._baseKeyCount():
+                keys.add(str(self._baseKeyBytes(i), 'utf-8', 'ignore'))
+                i = i + 1
+            self.sortedKeys = sorted(keys)
+        return self.sortedKeys
+    def add(self, key, rowId):
+        self._materialize(key).append(rowId)
+        self.log.add(key, rowId)
+    def addMany(self, sortedPairs):
+        for key, group in groupby(sortedPairs, itemgetter(0)):
+            self._materialize(key, False).extend([pair[1] for pair in group])
+        self.log.addMany(sortedPairs)
+    def _tombstone(self, key, rowId):
+        dead = self.tombstones.get(key)
+        if dead is None:
+            dead = set()
+            self.tombstones[key] = dead
+        if rowId in dead:
+            return False
+        dead.add(rowId)
+        self.tombstoneCount = self.tombstoneCount + 1
+        return True
     def removeRowIds(self, key, rowIdsSet):
-        arr = self.map.get(key)
-        if arr is None:
+        if key not in self.map and self._find(key) < 0:
             return
-        newArr = []
-        i = 0
-        while i < len(arr):
-            if arr[i] not in rowIdsSet:
-                newArr.append(arr[i])
-            i = i + 1
-        self.map[key] = newArr
+        for rid in rowIdsSet:
+            if self._tombstone(key, rid):
+                self.log.remove(key, rid)
+        if self.tombstoneCount > INDEX_TOMBSTONE_LIMIT:
+            self.purge()
+    def purge(self):
+        for key, dead in self.tombstones.items():
+            arr = self._materialize(key)
+            self.map[key] = [rid for rid in arr if rid not in dead]
+        self.tombstones = {}
+        self.tombstoneCount = 0
     def getRowIds(self, key):
+        return list(self._postings(key))
+    def postingCount(self, key):
+        if key in self.tombstones:
+            return len(self._postings(key))
         arr = self.map.get(key)
-        if arr is None:
-            return []
-        return list(arr)
-    def save(self):
-        items = list(self.map.items())
-        with open(self.path, 'wb') as f:
-            f.write(struct.pack('<I', len(items)))
-            i = 0
-            while i < len(items):
-                key = items[i][0]
-                ids = items[i][1]
-                kbytes = key.encode('utf-8')
-                f.write(struct.pack('<I', len(kbytes)))
-                f.write(kbytes)
-                f.write(struct.pack('<I', len(ids)))
-                j = 0
-                while j < len(ids):
-                    f.write(struct.pack('<Q', int(ids[j])))
-                    j = j + 1
+        if arr is not None:
+            return len(arr)
+        i = self._find(key)
+        return 0 if i < 0 else self.basePostings.count(i)
+    def prefixRowIds(self, prefix):
+        if not self.map and not self.tombstones:
+            target = encodeKey(prefix)
+            i = self._baseLowerBound(target)
+            end = self._basePrefixEnd(target, i)
+            res = []
+            while i < end:
+                res.extend(self.basePostings.get(i))
                 i = i + 1
-
+            return res
+        keys = self._keys()
+        res = []
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and keys[i].startswith(prefix):
+            res.extend(self._postings(keys[i]))
+            i = i + 1
+        return res
+    def rangeRowIds(self, low=None, high=None, lowInclusive=True, highInclusive=True):
+        keys = self._keys()
+        start = 0
+        end = len(keys)
+        if low is not None:
+            start = bisect_left(keys, low) if lowInclusive else bisect_right(keys, low)
+        if high is not None:
+            end = bisect_right(keys, high) if highInclusive else bisect_left(keys, high)
+        res = []
+        i = start
+        while i < end:
+            res.extend(self._postings(keys[i]))
+            i = i + 1
+        return res
+    def orderedItems(self, reverse=False):
+        keys = self._keys()
+        order = reversed(keys) if reverse else keys
+        for key in order:
+            yield key, self._postings(key)
+    def clear(self):
+        self.map = {}
+        self.tombstones = {}
+        self.tombstoneCount = 0
+        self.sortedKeys = []
+        self._setBase(b'', array('Q', [0]), PostingBlock())
+        self.log.markRewrite()
+    def save(self, compact=True):
+        if not self.log.mustCompact(compact):
+            self.log.flush(encodeKey)
+            return
+        blob = bytearray()
+        keyOffsets = array('Q', [0])
+        lists = []
+        for key in self._keys():
+            ids = self._postings(key)
+            if len(ids) == 0:
+                continue
+            blob += encodeKey(key)
+            keyOffsets.append(len(blob))
+            lists.append(sorted(ids))
+        blob = bytes(blob)
+        postings = PostingBlock.build(lists)
+        data = b''.join([
+            STR_INDEX_HEADER.pack(STR_INDEX_MAGIC, len(keyOffsets) - 1, len(blob)),
+            arrayBytes(keyOffsets),
+            blob,
+            postings.toBytes()
+        ])
+        self.log.compact(data, postings.total())
+        self._setBase(blob, keyOffsets, postings)
+        self.map = {}
+        self.tombstones = {}
+        self.tombstoneCount = 0
+        self.sortedKeys = None
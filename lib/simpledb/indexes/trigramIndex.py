@@ -0,0 +1,54 @@
+from .strIndex import StrIndex
+from .postings import intersectSorted
+
+TRIGRAM_SIZE = 3
+
+
+def trigrams(text):
+    return set(text[i:i + TRIGRAM_SIZE] for i in range(len(text) - TRIGRAM_SIZE + 1))
+
+
+def patternTrigrams(pattern):
+    res = set()
+    segment = []
+    for ch in pattern + '%':
+        if ch == '%' or ch == '_':
+            res.update(trigrams(''.join(segment)))
+            segment = []
+        else:
+            segment.append(ch)
+    return res
+
+
+class TrigramIndex:
+    def __init__(self, path):
+        self.path = path
+        self.store = StrIndex(path)
+    def add(self, value, rowId):
+        for tri in trigrams(value):
+            self.store.add(tri, rowId)
+    def addMany(self, sortedPairs):
+        pairs = []
+        for value, rid in sortedPairs:
+            for tri in trigrams(value):
+                pairs.append((tri, rid))
+        pairs.sort()
+        self.store.addMany(pairs)
+    def removeRowIds(self, value, rowIdsSet):
+        for tri in trigrams(value):
+            self.store.removeRowIds(tri, rowIdsSet)
+    def candidateRowIds(self, pattern):
+        grams = patternTrigrams(pattern)
+        if not grams:
+            return None
+        postings = sorted((self.store.getRowIds(tri) for tri in grams), key=len)
+        res = postings[0]
+        for ids in postings[1:]:
+            if not res:
+                break
+            res = intersectSorted(res, ids)
+        return res
+    def clear(self):
+        self.store.clear()
+    def save(self, compact=True):
+        self.store.save(compact)
@@ -1,4 +1,252 @@
 import json
+import re
+
+
+class Placeholder:
+    def __repr__(self):
+        return '?'
+
+
+PARAM = Placeholder()
+
+
+def _splitValueTuples(text):
+    text = text.strip()
+    if not text.startswith('('):
+        text = '(' + text + ')'
+    rows = []
+    current = None
+    start = 0
+    n = len(text)
+    i = 0
+    while i < n:
+        ch = text[i]
+        if ch == '"' or ch == "'":
+            closePos = text.find(ch, i + 1)
+            i = n if closePos < 0 else closePos + 1
+            continue
+        if ch == '(' and current is None:
+            current = []
+            start = i + 1
+        elif ch == ',' and current is not None:
+            current.append(text[start:i].strip())
+            start = i + 1
+        elif ch == ')' and current is not None:
+            current.append(text[start:i].strip())
+            rows.append(current)
+            current = None
+        i = i + 1
+    if current is not None:
+        current.append(text[start:].strip())
+        rows.append(current)
+    return rows
+
+
+def _parseLiteral(v):
+    if v == '?':
+        return PARAM
+    if (v.startswith('"') and v.endswith('"') and len(v) >= 2) or (v.startswith("'") and v.endswith("'") and len(v) >= 2):
+        return v[1:-1]
+    return int(v)
+
+
+WHERE_TOKEN = re.compile(r"""\s*(?:('[^']*'|"[^"]*")|(<=|>=|!=|<>|=|<|>|\(|\)|,|\?)|([^\s'"<>=!(),?]+))""")
+COMPARISON_OPS = ('=', '!=', '<>', '<', '<=', '>', '>=')
+
+
+def _tokenizeWhere(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        m = WHERE_TOKEN.match(text, pos)
+        if m is None or m.end() == pos:
+            raise ValueError('cannot parse WHERE near: ' + text[pos:])
+        if m.group(1) is not None:
+            tokens.append(('str', m.group(1)[1:-1]))
+        elif m.group(2) is not None:
+            tokens.append(('sym', m.group(2)))
+        else:
+            tokens.append(('word', m.group(3)))
+        pos = m.end()
+    return tokens
+
+
+class _WhereParser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return (None, None)
+
+    def next(self):
+        tok = self.peek()
+        self.pos = self.pos + 1
+        return tok
+
+    def isKeyword(self, word):
+        kind, value = self.peek()
+        return kind == 'word' and value.lower() == word
+
+    def expect(self, kind, value):
+        tok = self.next()
+        if tok[0] != kind or (tok[1].lower() if kind == 'word' else tok[1]) != value:
+            raise ValueError('expected ' + value + ' in WHERE')
+
+    def parseOr(self):
+        args = [self.parseAnd()]
+        while self.isKeyword('or'):
+            self.next()
+            args.append(self.parseAnd())
+        return self._combine('or', args)
+
+    def parseAnd(self):
+        args = [self.parsePrimary()]
+        while self.isKeyword('and'):
+            self.next()
+            args.append(self.parsePrimary())
+        return self._combine('and', args)
+
+    def _combine(self, op, args):
+        if len(args) == 1:
+            return args[0]
+        flat = []
+        for a in args:
+            if a['op'] == op:
+                flat.extend(a['args'])
+            else:
+                flat.append(a)
+        return {'op': op, 'args': flat}
+
+    def parseValue(self):
+        kind, value = self.next()
+        if kind == 'str':
+            return value
+        if kind == 'sym' and value == '?':
+            return PARAM
+        if kind == 'word':
+            try:
+                return int(value)
+            except ValueError:
+                return value
+        raise ValueError('expected value in WHERE')
+
+    def parsePrimary(self):
+        kind, value = self.peek()
+        if kind == 'sym' and value == '(':
+            self.next()
+            node = self.parseOr()
+            self.expect('sym', ')')
+            return node
+        kind, col = self.next()
+        if kind != 'word':
+            raise ValueError('expected column name in WHERE')
+        if self.isKeyword('between'):
+            self.next()
+            low = self.parseValue()
+            self.expect('word', 'and')
+            high = self.parseValue()
+            return {'op': 'between', 'col': col, 'low': low, 'high': high}
+        if self.isKeyword('like'):
+            self.next()
+            return {'op': 'like', 'col': col, 'value': self.parseValue()}
+        if self.isKeyword('match'):
+            self.next()
+            return {'op': 'match', 'col': col, 'value': self.parseValue()}
+        if self.isKeyword('in'):
+            self.next()
+            self.expect('sym', '(')
+            values = [self.parseValue()]
+            while self.peek() == ('sym', ','):
+                self.next()
+                values.append(self.parseValue())
+            self.expect('sym', ')')
+            return {'op': 'in', 'col': col, 'values': values}
+        kind, op = self.next()
+        if kind != 'sym' or op not in COMPARISON_OPS:
+            raise ValueError('expected comparison in WHERE')
+        if op == '<>':
+            op = '!='
+        return {'op': op, 'col': col, 'value': self.parseValue()}
+
+
+def _parseWhere(text):
+    try:
+        parser = _WhereParser(_tokenizeWhere(text))
+        node = parser.parseOr()
+        if parser.pos != len(parser.tokens):
+            return None
+    except (ValueError, IndexError, AttributeError):
+        return None
+    if node['op'] == '=':
+        return (node['col'], node['value'])
+    return node
+
+
+AGGREGATE_CALL = re.compile(r'^(count|sum|min|max|avg)\s*\(\s*([^\s()]+)\s*\)$', re.IGNORECASE)
+GROUP_BY = re.compile(r'\s+group\s+by\s+', re.IGNORECASE)
+ORDER_BY = re.compile(r'\s+order\s+by\s+', re.IGNORECASE)
+LIMIT_CLAUSE = re.compile(r'\s+limit\s+(\d+|\?)\s*$', re.IGNORECASE)
+JOIN_SPLIT = re.compile(r'\s+(?:inner\s+)?join\s+', re.IGNORECASE)
+ON_SPLIT = re.compile(r'\s+on\s+', re.IGNORECASE)
+QUOTED_LITERAL = re.compile(r"""('[^']*'|"[^"]*")""")
+
+
+def _maskLiterals(text):
+    return QUOTED_LITERAL.sub(lambda m: m.group(0)[0] + '_' * (len(m.group(0)) - 2) + m.group(0)[-1], text)
+
+
+def _parseTableRef(text):
+    parts = text.split()
+    if len(parts) == 3 and parts[1].lower() == 'as':
+        return parts[0], parts[2]
+    if len(parts) == 2:
+        return parts[0], parts[1]
+    if len(parts) == 1:
+        return parts[0], parts[0]
+    return None, None
+
+
+def _parseJoins(tableSegment):
+    segments = JOIN_SPLIT.split(tableSegment)
+    tableName, alias = _parseTableRef(segments[0])
+    if tableName is None:
+        return None
+    joins = []
+    i = 1
+    while i < len(segments):
+        parts = ON_SPLIT.split(segments[i], 1)
+        if len(parts) != 2:
+            return None
+        joinTable, joinAlias = _parseTableRef(parts[0])
+        cond = parts[1].split('=')
+        if joinTable is None or len(cond) != 2:
+            return None
+        joins.append({'table': joinTable, 'alias': joinAlias, 'left': cond[0].strip(), 'right': cond[1].strip()})
+        i = i + 1
+    return {'table': tableName, 'alias': alias, 'joins': joins}
+
+
+def _parseSelectItems(colNames, groupBy):
+    items = []
+    hasAggregate = False
+    for name in colNames:
+        m = AGGREGATE_CALL.match(name)
+        if m is None:
+            items.append({'func': None, 'col': name})
+            continue
+        func = m.group(1).lower()
+        col = m.group(2)
+        if col == '*' and func != 'count':
+            return None
+        items.append({'func': func, 'col': col})
+        hasAggregate = True
+    if not hasAggregate and not groupBy:
+        return None
+    return items
 
 
 def parseSql(sqlText: str):
@@ -29,12 +277,17 @@ def parseSql(sqlText: str):
                 columns.append({'name': name, 'type': 'INT'})
             i = i + 1
         return {'type': 'create_table', 'data': {'table': tableName, 'columns': columns}}
-    if low.startswith('create index'):
-        p = low.find('on')
-        rest = s[p+2:].strip()
+    if low.startswith('create index') or low.startswith('create trigram index') or low.startswith('create fulltext index'):
+        p = low.find(' on ')
+        rest = s[p+4:].strip()
         tableName = rest.split('(')[0].strip()
         col = rest[rest.find('(')+1:rest.find(')')].strip()
-        return {'type': 'create_index', 'data': {'table': tableName, 'column': col}}
+        kind = 'value'
+        if low.startswith('create trigram'):
+            kind = 'trigram'
+        elif low.startswith('create fulltext'):
+            kind = 'fulltext'
+        return {'type': 'create_index', 'data': {'table': tableName, 'column': col, 'kind': kind}}
     if low.startswith('insert into'):
         after = s[len('insert into'):].strip()
         tableName = after.split()[0]
@@ -46,64 +299,47 @@ def parseSql(sqlText: str):
         if posVals < 0:
             return {'type': 'noop'}
         valsPart = s[posVals+6:].strip()
-        if valsPart.startswith('(') and valsPart.endswith(')'):
-            valsPart = valsPart[1:-1]
-        rawVals = []
-        buf = ''
-        inside = False
-        quoteChar = None
-        i = 0
-        while i < len(valsPart):
-            ch = valsPart[i]
-            if ch in ('"', "'"):
-                if quoteChar is None:
-                    quoteChar = ch
-                    inside = True
-                    buf = buf + ch
-                elif quoteChar == ch:
-                    inside = False
-                    quoteChar = None
-                    buf = buf + ch
-                else:
-                    buf = buf + ch
-            elif ch == ',' and not inside:
-                rawVals.append(buf.strip())
-                buf = ''
-            else:
-                buf = buf + ch
-            i = i + 1
-        if len(buf) > 0:
-            rawVals.append(buf.strip())
-        values = []
-        i = 0
-        while i < len(rawVals):
-            v = rawVals[i]
-            if (v.startswith('"') and v.endswith('"') and len(v) >= 2) or (v.startswith("'") and v.endswith("'") and len(v) >= 2):
-                values.append(v[1:-1])
-            else:
-                values.append(int(v))
-            i = i + 1
-        return {'type': 'insert', 'data': {'table': tableName, 'columns': cols, 'values': values}}
+        rows = []
+        for rawVals in _splitValueTuples(valsPart):
+            rows.append([_parseLiteral(v) for v in rawVals])
+        if len(rows) == 0:
+            return {'type': 'noop'}
+        return {'type': 'insert', 'data': {'table': tableName, 'columns': cols, 'values': rows[0], 'rows': rows}}
     if low.startswith('select'):
         pfrom = low.find(' from ')
         colsPart = s[6:pfrom].strip()
         tableSegment = s[pfrom+6:].strip()
+        masked = _maskLiterals(tableSegment)
+        limit = None
+        m = LIMIT_CLAUSE.search(masked)
+        if m is not None:
+            limit = PARAM if m.group(1) == '?' else int(m.group(1))
+            tableSegment = tableSegment[:m.start()]
+            masked = masked[:m.start()]
+        orderBy = None
+        m = ORDER_BY.search(masked)
+        if m is not None:
+            parts = tableSegment[m.end():].split()
+            if len(parts) == 0 or len(parts) > 2 or (len(parts) == 2 and parts[1].lower() not in ('asc', 'desc')):
+                return {'type': 'noop'}
+            orderBy = {'col': parts[0], 'desc': len(parts) == 2 and parts[1].lower() == 'desc'}
+            tableSegment = tableSegment[:m.start()]
+            masked = masked[:m.start()]
+        groupBy = []
+        m = GROUP_BY.search(masked)
+        if m is not None:
+            for name in tableSegment[m.end():].split(','):
+                groupBy.append(name.strip())
+            tableSegment = tableSegment[:m.start()]
+            masked = masked[:m.start()]
         where = None
-        pwhere = tableSegment.lower().find(' where ')
+        pwhere = masked.lower().find(' where ')
         if pwhere >= 0:
             wherePart = tableSegment[pwhere+7:].strip()
             tableName = tableSegment[:pwhere].strip()
-            eqPos = wherePart.find('=')
-            if eqPos >= 0:
-                left = wherePart[:eqPos].strip()
-                right = wherePart[eqPos+1:].strip()
-                if (right.startswith('"') and right.endswith('"') and len(right) >= 2) or (right.startswith("'") and right.endswith("'") and len(right) >= 2):
-                    where = (left, right[1:-1])
-                else:
-                    try:
-                        where = (left, int(right))
-                    except Exception:
-                        where = (left, right)
+            where = _parseWhere(wherePart)
+            if where is None:
+                return {'type': 'noop'}
         else:
             tableName = tableSegment.strip()
         if colsPart == '*':
@@ -115,7 +351,23 @@ def parseSql(sqlText: str):
             while i < len(parts):
                 colNames.append(parts[i].strip())
                 i = i + 1
-        return {'type': 'select', 'data': {'table': tableName, 'columns': colNames, 'where': where}}
+        aggregates = _parseSelectItems(colNames, groupBy)
+        if JOIN_SPLIT.search(tableName):
+            data = _parseJoins(tableName)
+            if data is None:
+                return {'type': 'noop'}
+            data['columns'] = colNames
+            data['where'] = where
+        else:
+            data = {'table': tableName, 'columns': colNames, 'where': where}
+        if aggregates is not None:
+            data['aggregates'] = aggregates
+            data['groupBy'] = groupBy
+        if orderBy is not None:
+            data['orderBy'] = orderBy
+        if limit is not None:
+            data['limit'] = limit
+        return {'type': 'select_join' if 'joins' in data else 'select', 'data': data}
     if low.startswith('delete *'):
         after = s[len('delete *'):].strip()
         if after.lower().startswith('from'):
@@ -129,15 +381,8 @@ def parseSql(sqlText: str):
         if pwhere < 0:
             return {'type': 'noop'}
         wherePart = after[pwhere+5:].strip()
-        eqPos = wherePart.find('=')
-        if eqPos >= 0:
-            left = wherePart[:eqPos].strip()
-            right = wherePart[eqPos+1:].strip()
-            if (right.startswith('"') and right.endswith('"') and len(right) >= 2) or (right.startswith("'") and right.endswith("'") and len(right) >= 2):
-                return {'type': 'delete_where', 'data': {'table': tableName, 'where': (left, right[1:-1])}}
-            try:
-                return {'type': 'delete_where', 'data': {'table': tableName, 'where': (left, int(right))}}
-            except Exception:
-                return {'type': 'delete_where', 'data': {'table': tableName, 'where': (left, right)}}
+        where = _parseWhere(wherePart)
+        if where is not None:
+            return {'type': 'delete_where', 'data': {'table': tableName, 'where': where}}
         return {'type': 'noop'}
     return {'type': 'noop'}
@@ -8,5 +8,13 @@ class TableFiles:
         return os.path.join(self.baseDir, self.tableName + '.schema.json')
     def dataPath(self):
         return os.path.join(self.baseDir, self.tableName + '.data')
+    def offsetsPath(self):
+        return os.path.join(self.baseDir, self.tableName + '.offsets')
+    def activePath(self):
+        return os.path.join(self.baseDir, self.tableName + '.active')
     def indexPath(self, colName):
         return os.path.join(self.baseDir, self.tableName + '.' + colName + '.index')
+    def trigramPath(self, colName):
+        return os.path.join(self.baseDir, self.tableName + '.' + colName + '.trigram')
+    def fulltextPath(self, colName):
+        return os.path.join(self.baseDir, self.tableName + '.' + colName + '.fts')
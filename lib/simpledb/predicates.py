@@ -0,0 +1,213 @@
+import re
+import operator
+from .parser.sqlParser import PARAM
+from .indexes.fulltextIndex import tokenize, parseMatchQuery
+from .rowcodec import COMPARISON_SYMBOLS
+
+LIKE_WILDCARDS = ('%', '_')
+VALUE_COMPARISONS = {
+    '=': operator.eq, '!=': operator.ne,
+    '<': operator.lt, '<=': operator.le,
+    '>': operator.gt, '>=': operator.ge
+}
+
+
+def normalizeWhere(where):
+    if where is None or isinstance(where, dict):
+        return where
+    if len(where) == 2:
+        return {'op': '=', 'col': where[0], 'value': where[1]}
+    if where[1] == 'between':
+        return {'op': 'between', 'col': where[0], 'low': where[2][0], 'high': where[2][1]}
+    if where[1] == 'in':
+        return {'op': 'in', 'col': where[0], 'values': list(where[2])}
+    return {'op': where[1], 'col': where[0], 'value': where[2]}
+
+
+def countParams(pred):
+    if pred is None:
+        return 0
+    op = pred['op']
+    if op == 'and' or op == 'or':
+        return sum(countParams(p) for p in pred['args'])
+    if op == 'between':
+        return (pred['low'] is PARAM) + (pred['high'] is PARAM)
+    if op == 'in':
+        return sum(1 for v in pred['values'] if v is PARAM)
+    return 1 if pred['value'] is PARAM else 0
+
+
+def bindParams(pred, params, pos):
+    op = pred['op']
+    if op == 'and' or op == 'or':
+        args = []
+        for p in pred['args']:
+            bound, pos = bindParams(p, params, pos)
+            args.append(bound)
+        return {'op': op, 'args': args}, pos
+    res = dict(pred)
+    if op == 'between':
+        for name in ('low', 'high'):
+            if res[name] is PARAM:
+                res[name] = params[pos]
+                pos = pos + 1
+    elif op == 'in':
+        values = []
+        for v in res['values']:
+            if v is PARAM:
+                values.append(params[pos])
+                pos = pos + 1
+            else:
+                values.append(v)
+        res['values'] = values
+    elif res['value'] is PARAM:
+        res['value'] = params[pos]
+        pos = pos + 1
+    return res, pos
+
+
+def likePrefix(pattern):
+    i = 0
+    while i < len(pattern) and pattern[i] not in LIKE_WILDCARDS:
+        i = i + 1
+    return pattern[:i]
+
+
+def likeRegex(pattern):
+    parts = []
+    for ch in pattern:
+        if ch == '%':
+            parts.append('.*')
+        elif ch == '_':
+            parts.append('.')
+        else:
+            parts.append(re.escape(ch))
+    return re.compile(''.join(parts), re.DOTALL)
+
+
+def convertValue(colType, value):
+    return int(value) if colType == 'INT' else str(value)
+
+
+def _compileTextMatcher(pred, schema, colIdx, read):
+    op = pred['op']
+    decoder = schema.decoder
+    colMax = schema.maxLengths[colIdx]
+    if op == '=' or op == '!=':
+        key = str(pred['value'])
+        encoded = key.encode('utf-8')
+        equals = decoder.textEquals(colIdx, encoded)
+        if colMax is not None and colMax - 3 <= len(encoded) < colMax:
+            rawEquals = equals
+            equals = lambda data: rawEquals(data) or read(data) == key
+        if op == '=':
+            return equals
+        return lambda data: not equals(data)
+    if op == 'in':
+        keys = set(str(v).encode('utf-8') for v in pred['values'])
+        for encoded in keys:
+            if colMax is not None and colMax - 3 <= len(encoded) < colMax:
+                return None
+        raw = decoder.textBytes(colIdx)
+        return lambda data: raw(data) in keys
+    if op == 'like':
+        pattern = str(pred['value'])
+        prefix = likePrefix(pattern)
+        if pattern == prefix + '%':
+            return decoder.textPrefix(colIdx, prefix.encode('utf-8'))
+    return None
+
+
+def compileMatcher(pred, schema):
+    op = pred['op']
+    if op == 'and' or op == 'or':
+        parts = [compileMatcher(p, schema) for p in pred['args']]
+        if op == 'and':
+            def matchAll(data):
+                for part in parts:
+                    if not part(data):
+                        return False
+                return True
+            return matchAll
+        def matchAny(data):
+            for part in parts:
+                if part(data):
+                    return True
+            return False
+        return matchAny
+    colIdx = schema.columnIndex(pred['col'])
+    if colIdx < 0:
+        return lambda data: False
+    colType = schema.types[colIdx]
+    read = schema.decoder.reader(colIdx)
+    if colType == 'VARCHAR':
+        matcher = _compileTextMatcher(pred, schema, colIdx, read)
+        if matcher is not None:
+            return matcher
+    if op == 'between':
+        return schema.decoder.between(colIdx, convertValue(colType, pred['low']), convertValue(colType, pred['high']))
+    if op == 'in':
+        keys = set(convertValue(colType, v) for v in pred['values'])
+        return lambda data: read(data) in keys
+    if op == 'match':
+        groups = [set(terms) for terms in parseMatchQuery(str(pred['value']))]
+        def matchText(data):
+            tokens = set(tokenize(str(read(data))))
+            for terms in groups:
+                if terms <= tokens:
+                    return True
+            return False
+        return matchText
+    if op == 'like':
+        fullmatch = likeRegex(str(pred['value'])).fullmatch
+        return lambda data: fullmatch(str(read(data))) is not None
+    if op in COMPARISON_SYMBOLS:
+        return schema.decoder.comparison(colIdx, op, convertValue(colType, pred['value']))
+    raise ValueError('unsupported predicate ' + str(op))
+
+
+def compileValueMatcher(pred, resolve):
+    op = pred['op']
+    if op == 'and' or op == 'or':
+        parts = [compileValueMatcher(p, resolve) for p in pred['args']]
+        if op == 'and':
+            def matchAll(row):
+                for part in parts:
+                    if not part(row):
+                        return False
+                return True
+            return matchAll
+        def matchAny(row):
+            for part in parts:
+                if part(row):
+                    return True
+            return False
+        return matchAny
+    target = resolve(pred['col'])
+    if target is None:
+        return lambda row: False
+    read, colType = target
+    if op == 'between':
+        low = convertValue(colType, pred['low'])
+        high = convertValue(colType, pred['high'])
+        return lambda row: low <= read(row) <= high
+    if op == 'in':
+        keys = set(convertValue(colType, v) for v in pred['values'])
+        return lambda row: read(row) in keys
+    if op == 'match':
+        groups = [set(terms) for terms in parseMatchQuery(str(pred['value']))]
+        def matchText(row):
+            tokens = set(tokenize(str(read(row))))
+            for terms in groups:
+                if terms <= tokens:
+                    return True
+            return False
+        return matchText
+    if op == 'like':
+        fullmatch = likeRegex(str(pred['value'])).fullmatch
+        return lambda row: fullmatch(str(read(row))) is not None
+    if op in VALUE_COMPARISONS:
+        compare = VALUE_COMPARISONS[op]
+        key = convertValue(colType, pred['value'])
+        return lambda row: compare(read(row), key)
+    raise ValueError('unsupported predicate ' + str(op))
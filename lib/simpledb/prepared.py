@@ -0,0 +1,132 @@
+from .parser.sqlParser import PARAM
+from .predicates import normalizeWhere, countParams, bindParams
+
+
+class PreparedStatement:
+    def __init__(self, db, cmd):
+        self.db = db
+        self.cmd = cmd
+        self.type = cmd.get('type')
+        self.data = cmd.get('data', {})
+        self.paramCount = self._countParams()
+        self.engine = None
+        self.selIdx = None
+
+    def _countParams(self):
+        n = 0
+        if self.type == 'insert':
+            for values in self.data['rows']:
+                for v in values:
+                    if v is PARAM:
+                        n = n + 1
+        elif self.type in ('select', 'select_join', 'delete_where'):
+            n = countParams(normalizeWhere(self.data.get('where')))
+            if self.data.get('limit') is PARAM:
+                n = n + 1
+        return n
+
+    def _resolve(self):
+        tableName = self.data.get('table')
+        if self.engine is not None and self.db.tables.get(tableName) is self.engine:
+            return self.engine
+        eng = self.db._getEngine(tableName)
+        self.engine = eng
+        if eng is None:
+            return None
+        if self.type == 'select':
+            self.selIdx = eng.resolveColumns(self.data['columns'])
+        return eng
+
+    def _bindValues(self, values, params, pos):
+        bound = []
+        for v in values:
+            if v is PARAM:
+                bound.append(params[pos])
+                pos = pos + 1
+            else:
+                bound.append(v)
+        return bound, pos
+
+    def _bindWhere(self, params):
+        w = self.data.get('where')
+        if w is None:
+            return None
+        return bindParams(normalizeWhere(w), params, 0)[0]
+
+    def _bindLimit(self, params):
+        limit = self.data.get('limit')
+        if limit is PARAM:
+            return int(params[self.paramCount - 1])
+        return limit
+
+    def _checkParams(self, params):
+        if len(params) != self.paramCount:
+            raise ValueError('expected ' + str(self.paramCount) + ' parameters, got ' + str(len(params)))
+
+    def _bindRows(self, params):
+        cols = self.data['columns']
+        rows = []
+        pos = 0
+        for values in self.data['rows']:
+            bound, pos = self._bindValues(values, params, pos)
+            rows.append(dict(zip(cols, bound)))
+        return rows
+
+    def execute(self, params=()):
+        self._checkParams(params)
+        if self.type == 'insert':
+            eng = self._resolve()
+            if eng is None:
+                return []
+            rows = self._bindRows(params)
+            if len(rows) > 1:
+                eng.insertMany(rows)
+            else:
+                eng.insertRow(rows[0])
+            return []
+        if self.type == 'select' or self.type == 'select_join':
+            return list(self._iterRows(params))
+        if self.type == 'delete_where':
+            eng = self._resolve()
+            w = self.data.get('where')
+            if eng is None or not w:
+                return []
+            if isinstance(w, dict):
+                eng.deleteMatching(bindParams(w, params, 0)[0])
+            else:
+                eng.deleteWhere(w[0], params[0] if w[1] is PARAM else w[1])
+            return []
+        return self.db._executeCommand(self.cmd)
+
+    def _iterRows(self, params):
+        if self.type == 'select_join':
+            return self.db._iterJoin(self.data, self._bindWhere(params), self._bindLimit(params))
+        eng = self._resolve()
+        if eng is None:
+            return iter(())
+        orderBy = self.data.get('orderBy')
+        limit = self._bindLimit(params)
+        if self.data.get('aggregates') is not None:
+            return iter(eng.aggregate(self.data['aggregates'], self.data['groupBy'], self._bindWhere(params), orderBy, limit))
+        return eng.iterSelect(self.selIdx, self._bindWhere(params), orderBy, limit)
+
+    def iterate(self, params=()):
+        self._checkParams(params)
+        if self.type == 'select' or self.type == 'select_join':
+            return self._iterRows(params)
+        return iter(self.execute(params))
+
+    def executeMany(self, paramsList):
+        if self.type != 'insert':
+            for params in paramsList:
+                self.execute(params)
+            return []
+        eng = self._resolve()
+        if eng is None:
+            return []
+        rows = []
+        for params in paramsList:
+            self._checkParams(params)
+            rows.extend(self._bindRows(params))
+        eng.insertMany(rows)
+        return []
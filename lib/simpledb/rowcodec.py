@@ -2,27 +2,152 @@ from .constants import MAX_UINT64
 import struct
 
 MAX_UINT32 = 4294967295
+ROW_HEADER_SIZE = 1 + 4 + 2
+INT_STRUCT = struct.Struct('<I')
+COMPARISON_SYMBOLS = {'=': '==', '!=': '!=', '<': '<', '<=': '<=', '>': '>', '>=': '>='}
 
-def packValue(colType, colMax, value):
-    if colType == 'INT':
-        n = int(value)
-        if n < 0:
-            raise ValueError('INT negative')
-        if n > MAX_UINT32:
-            raise ValueError('INT overflow')
-        return struct.pack('<I', n)
+def storedText(value, colMax):
     s = '' if value is None else str(value)
-    b = s.encode('utf-8')
-    if colMax is not None and len(b) > int(colMax):
-        b = b[:int(colMax)]
-    return struct.pack('B', len(b)) + b
+    if colMax is None or len(s) * 4 <= int(colMax):
+        return s
+    return str(s.encode('utf-8')[:int(colMax)], 'utf-8', 'ignore')
 
 def unpackValue(colType, data, offset):
     if colType == 'INT':
-        v = struct.unpack('<I', data[offset:offset+4])[0]
+        v = INT_STRUCT.unpack_from(data, offset)[0]
         return v, offset + 4
-    ln = struct.unpack('B', data[offset:offset+1])[0]
+    ln = data[offset]
     start = offset + 1
     end = start + ln
-    s = data[start:end].decode('utf-8', errors='ignore')
+    s = str(data[start:end], 'utf-8', 'ignore')
     return s, end
+
+class RowDecoder:
+    def __init__(self, types):
+        self.types = list(types)
+        self.dirStruct = struct.Struct('<' + str(len(self.types)) + 'I')
+        self.projections = {}
+        self.readers = {}
+
+    def _compile(self, colIndexes):
+        lines = ['def decode(data):', '    d = dirUnpack(data, ' + str(ROW_HEADER_SIZE) + ')']
+        parts = []
+        for idx in colIndexes:
+            if self.types[idx] == 'INT':
+                parts.append('intUnpack(data, d[' + str(idx) + '])[0]')
+            else:
+                o = 'd[' + str(idx) + ']'
+                parts.append('str(data[' + o + ' + 1:' + o + ' + 1 + data[' + o + ']], "utf-8", "ignore")')
+        lines.append('    return (' + ''.join(p + ', ' for p in parts) + ')')
+        env = {'dirUnpack': self.dirStruct.unpack_from, 'intUnpack': INT_STRUCT.unpack_from}
+        exec('\n'.join(lines), env)
+        return env['decode']
+
+    def _compileColumn(self, colIdx, result, env):
+        lines = ['def column(data):', '    o = intUnpack(data, ' + str(ROW_HEADER_SIZE + 4 * colIdx) + ')[0]']
+        if self.types[colIdx] == 'INT':
+            lines.append('    v = intUnpack(data, o)[0]')
+        else:
+            lines.append('    v = str(data[o + 1:o + 1 + data[o]], "utf-8", "ignore")')
+        lines.append('    return ' + result)
+        env['intUnpack'] = INT_STRUCT.unpack_from
+        exec('\n'.join(lines), env)
+        return env['column']
+
+    def comparison(self, colIdx, op, key):
+        return self._compileColumn(colIdx, 'v ' + COMPARISON_SYMBOLS[op] + ' key', {'key': key})
+
+    def between(self, colIdx, low, high):
+        return self._compileColumn(colIdx, 'low <= v <= high', {'low': low, 'high': high})
+
+    def textEquals(self, colIdx, encoded):
+        pos = ROW_HEADER_SIZE + 4 * colIdx
+        n = len(encoded)
+        unpack = INT_STRUCT.unpack_from
+        def equals(data):
+            o = unpack(data, pos)[0]
+            return data[o] == n and data[o + 1:o + 1 + n] == encoded
+        return equals
+
+    def textPrefix(self, colIdx, encoded):
+        pos = ROW_HEADER_SIZE + 4 * colIdx
+        n = len(encoded)
+        unpack = INT_STRUCT.unpack_from
+        def startsWith(data):
+            o = unpack(data, pos)[0]
+            return data[o] >= n and data[o + 1:o + 1 + n] == encoded
+        return startsWith
+
+    def textBytes(self, colIdx):
+        pos = ROW_HEADER_SIZE + 4 * colIdx
+        unpack = INT_STRUCT.unpack_from
+        def raw(data):
+            o = unpack(data, pos)[0]
+            return bytes(data[o + 1:o + 1 + data[o]])
+        return raw
+
+    def projection(self, colIndexes):
+        key = tuple(colIndexes)
+        fn = self.projections.get(key)
+        if fn is None:
+            fn = self._compile(key)
+            self.projections[key] = fn
+        return fn
+
+    def reader(self, colIndex):
+        fn = self.readers.get(colIndex)
+        if fn is None:
+            fn = self._compileColumn(colIndex, 'v', {})
+            self.readers[colIndex] = fn
+        return fn
+
+class RowEncoder:
+    def __init__(self, codecs):
+        self.codecs = list(codecs)
+        count = len(self.codecs)
+        self.headerLen = ROW_HEADER_SIZE + count * 4
+        self.headerStruct = struct.Struct('<BIH' + str(count) + 'I')
+        self.maxRowSize = self.headerLen
+        for name, ctype, cmax in self.codecs:
+            if ctype == 'INT':
+                self.maxRowSize += 4
+            elif cmax is not None and int(cmax) < 255:
+                self.maxRowSize += 1 + int(cmax)
+            else:
+                self.maxRowSize += 1 + 255
+        self.encodeInto = self._compile()
+
+    def _compile(self):
+        count = len(self.codecs)
+        lines = ['def encodeInto(buf, pos, row):']
+        for i, (name, ctype, cmax) in enumerate(self.codecs):
+            v = 'v' + str(i)
+            lines.append('    ' + v + ' = row.get(' + repr(name) + ')')
+            if ctype == 'INT':
+                lines.append('    ' + v + ' = int(' + v + ')')
+                lines.append('    if ' + v + ' < 0:')
+                lines.append("        raise ValueError('INT negative')")
+                lines.append('    if ' + v + ' > ' + str(MAX_UINT32) + ':')
+                lines.append("        raise ValueError('INT overflow')")
+            else:
+                lines.append('    ' + v + " = ('' if " + v + ' is None else str(' + v + ")).encode('utf-8')")
+                if cmax is not None:
+                    lines.append('    ' + v + ' = ' + v + '[:' + str(int(cmax)) + ']')
+        lines.append('    o0 = ' + str(self.headerLen))
+        for i, (name, ctype, cmax) in enumerate(self.codecs):
+            size = '4' if ctype == 'INT' else '1 + len(v' + str(i) + ')'
+            lines.append('    o' + str(i + 1) + ' = o' + str(i) + ' + ' + size)
+        offsets = ''.join(', o' + str(i) for i in range(count))
+        lines.append('    headerPack(buf, pos, 1, o' + str(count) + ', ' + str(count) + offsets + ')')
+        for i, (name, ctype, cmax) in enumerate(self.codecs):
+            o = 'pos + o' + str(i)
+            v = 'v' + str(i)
+            if ctype == 'INT':
+                lines.append('    intPack(buf, ' + o + ', ' + v + ')')
+            else:
+                lines.append('    buf[' + o + '] = len(' + v + ')')
+                lines.append('    buf[' + o + ' + 1:' + o + ' + 1 + len(' + v + ')] = ' + v)
+        lines.append('    return pos + o' + str(count))
+        env = {'headerPack': self.headerStruct.pack_into, 'intPack': INT_STRUCT.pack_into}
+        exec('\n'.join(lines), env)
+        return env['encodeInto']
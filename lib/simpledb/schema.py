@@ -1,10 +1,27 @@
+from .rowcodec import RowDecoder, RowEncoder
+
 class Schema:
     def __init__(self, tableName, columns):
         self.tableName = tableName
         self.columns = columns
+        self.invalidate()
+    def invalidate(self):
+        self.positions = {}
+        self.types = []
+        self.maxLengths = []
+        self.codecs = []
+        for i, c in enumerate(self.columns):
+            self.positions[c['name']] = i
+            self.types.append(c['type'])
+            cmax = c.get('max')
+            self.maxLengths.append(None if cmax is None else int(cmax))
+            self.codecs.append((c['name'], c['type'], cmax))
+        self.decoder = RowDecoder(self.types)
+        self.encoder = RowEncoder(self.codecs)
+    def columnIndex(self, name):
+        return self.positions.get(name, -1)
     def toDict(self):
         return {"table": self.tableName, "columns": self.columns}
     @staticmethod
     def fromDict(d):
         return Schema(d["table"], d["columns"])
-
@@ -1,8 +1,15 @@
 import pytest
 import os
 import shutil
+import struct
 from lib.simpledb.database import SimpleDatabase
-from lib.simpledb.parser.sqlParser import parseSql
+from lib.simpledb.parser.sqlParser import parseSql, PARAM
+from lib.simpledb.bitmap import RowBitmap
+from lib.simpledb.schema import Schema
+from lib.simpledb.paths import TableFiles
+from lib.simpledb.engine.table_engine import TableEngine
+from lib.simpledb.indexes import IntIndex, StrIndex
+from lib.simpledb.indexes.postings import encodePostings, decodePostings, intersectSorted, unionSorted
 
 
 def test_parse_create_table():
@@ -39,6 +46,13 @@ def test_parse_insert_mixed_values():
     assert result['data']['values'] == [10, 'Laptop', 1000]
 
 
+def test_parse_insert_multiple_tuples():
+    result = parseSql("INSERT INTO users (id, name) VALUES (1, 'Bob'), (2, 'O, (x)'),(3, \"it's\")")
+    assert result['type'] == 'insert'
+    assert result['data']['values'] == [1, 'Bob']
+    assert result['data']['rows'] == [[1, 'Bob'], [2, 'O, (x)'], [3, "it's"]]
+
+
 def test_parse_select_all():
     result = parseSql("SELECT * FROM users")
     assert result['type'] == 'select'
@@ -174,3 +188,865 @@ def test_simpledb_three_columns_with_strings(temp_db_dir):
     assert results[1][2] == 25
 
     db.closeAll()
+
+
+def test_simpledb_buffered_rows_visible_and_persisted(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE users (id INT, name VARCHAR(50))")
+    for i in range(1, 6):
+        db.execute(f"INSERT INTO users (id, name) VALUES ({i}, 'user{i}')")
+    db.execute("DELETE FROM users WHERE id=2")
+
+    results = db.execute("SELECT * FROM users")
+    assert [r[0] for r in results] == [1, 3, 4, 5]
+    db.closeAll()
+
+    reopened = SimpleDatabase(temp_db_dir)
+    results = reopened.execute("SELECT name FROM users WHERE id=5")
+    assert results == [('user5',)]
+    reopened.closeAll()
+
+
+def test_simpledb_scan_after_delete_and_more_inserts(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE users (id INT, name VARCHAR(50))")
+    db.execute("INSERT INTO users (id, name) VALUES (1, 'Bob')")
+    db.execute("INSERT INTO users (id, name) VALUES (2, 'Alice')")
+    assert len(db.execute("SELECT * FROM users")) == 2
+
+    db.execute("DELETE FROM users WHERE name='Bob'")
+    db.execute("INSERT INTO users (id, name) VALUES (3, 'Борис')")
+
+    results = db.execute("SELECT id, name FROM users")
+    assert results == [(2, 'Alice'), (3, 'Борис')]
+    assert db.execute("SELECT id FROM users WHERE name='Борис'") == [(3,)]
+
+    db.closeAll()
+
+
+def test_simpledb_offsets_sidecar_rebuilt_on_mismatch(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE users (id INT, name VARCHAR(50))")
+    db.execute("INSERT INTO users (id, name) VALUES (1, 'Bob')")
+    db.execute("INSERT INTO users (id, name) VALUES (2, 'Alice')")
+    db.closeAll()
+
+    offsetsPath = os.path.join(temp_db_dir, 'users.offsets')
+    assert os.path.getsize(offsetsPath) == 16
+
+    with open(offsetsPath, 'ab') as f:
+        f.write(b'\x07' * 8)
+    reopened = SimpleDatabase(temp_db_dir)
+    assert reopened.execute("SELECT id FROM users") == [(1,), (2,)]
+    reopened.closeAll()
+    assert os.path.getsize(offsetsPath) == 16
+
+    os.remove(offsetsPath)
+    reopened = SimpleDatabase(temp_db_dir)
+    reopened.execute("INSERT INTO users (id, name) VALUES (3, 'Charlie')")
+    assert reopened.execute("SELECT name FROM users WHERE id=3") == [('Charlie',)]
+    reopened.closeAll()
+    assert os.path.getsize(offsetsPath) == 24
+
+
+def test_simpledb_active_rows_sidecar(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE users (id INT, name VARCHAR(20))")
+    db.tables['users'].insertMany([{'id': i, 'name': 'u' + str(i)} for i in range(20)])
+    db.execute("DELETE FROM users WHERE id=3")
+    db.closeAll()
+    activePath = os.path.join(temp_db_dir, 'users.active')
+    assert os.path.isfile(activePath)
+
+    eng = TableEngine(TableFiles(temp_db_dir, 'users'), db._loadSchema('users'))
+    eng._getDataView = None
+    eng.open()
+    assert eng.liveRowCount() == 19
+    assert not eng._isRowActive(3) and eng._isRowActive(4)
+    eng.close()
+
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("INSERT INTO users (id, name) VALUES (20, 'tail')")
+    db.tables['users'].flush()
+
+    crashed = SimpleDatabase(temp_db_dir)
+    assert crashed.execute("SELECT COUNT(*) FROM users") == [(20,)]
+    assert crashed.execute("SELECT name FROM users WHERE id=20") == [('tail',)]
+    crashed.execute("DELETE FROM users WHERE id=5")
+    assert not os.path.isfile(activePath)
+
+    crashed = SimpleDatabase(temp_db_dir)
+    assert crashed.execute("SELECT COUNT(*) FROM users") == [(19,)]
+    assert crashed.execute("SELECT id FROM users WHERE id=5") == []
+    crashed.closeAll()
+
+
+def test_schema_column_lookup_tables():
+    schema = Schema('users', [{'name': 'id', 'type': 'INT'}, {'name': 'name', 'type': 'VARCHAR', 'max': 20}])
+    assert schema.columnIndex('name') == 1
+    assert schema.columnIndex('missing') == -1
+    assert schema.types == ['INT', 'VARCHAR']
+    assert schema.maxLengths == [None, 20]
+    schema.columns.append({'name': 'age', 'type': 'INT'})
+    schema.invalidate()
+    assert schema.columnIndex('age') == 2
+
+
+def test_schema_decoder_projection_matches_row_values(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE products (product_id INT, title VARCHAR(10), price INT)")
+    db.execute("INSERT INTO products (product_id, title, price) VALUES (7, 'Клавиатура', 300)")
+    eng = db.tables['products']
+    data = eng._readRowBytes(0)
+    assert eng.schema.decoder.projection((2, 0))(data) == (300, 7)
+    assert eng.schema.decoder.reader(1)(data) == 'Клави'
+    assert eng.readRow(0) == [7, 'Клави', 300]
+    db.closeAll()
+
+
+def test_row_bitmap_from_flags_matches_appends():
+    flags = bytes([1, 0, 1, 1, 0, 0, 0, 1, 1, 0, 1])
+    packed = RowBitmap.fromFlags(flags)
+    appended = RowBitmap()
+    for flag in flags:
+        appended.append(flag)
+    assert packed.bits == appended.bits
+    assert [packed.isSet(i) for i in range(len(flags))] == [f == 1 for f in flags]
+    packed.clear(0)
+    packed.set(1)
+    assert not packed.isSet(0)
+    assert packed.isSet(1)
+    assert not packed.isSet(len(flags))
+
+
+def test_simpledb_live_row_counter(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE users (id INT, name VARCHAR(50))")
+    db.execute("CREATE INDEX ON users(id)")
+    for i in range(1, 5):
+        db.execute(f"INSERT INTO users (id, name) VALUES ({i}, 'user{i}')")
+    db.execute("DELETE FROM users WHERE id=2")
+    db.execute("DELETE FROM users WHERE name='user3'")
+    db.execute("DELETE FROM users WHERE name='user3'")
+    assert db.tables['users'].liveRowCount() == 2
+    db.closeAll()
+
+    reopened = SimpleDatabase(temp_db_dir)
+    eng = reopened._getEngine('users')
+    assert eng.liveRowCount() == 2
+    assert eng.rowCount() == 4
+    reopened.execute("DELETE * FROM users")
+    assert eng.liveRowCount() == 0
+    reopened.closeAll()
+
+
+def test_simpledb_execute_many_batches_inserts(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE users (id INT, name VARCHAR(50))")
+    db.execute("CREATE INDEX ON users(id)")
+    db.executeMany([
+        "INSERT INTO users (id, name) VALUES (1, 'Bob')",
+        "INSERT INTO users (id, name) VALUES (2, 'Alice')",
+        "DELETE FROM users WHERE id=1",
+        "INSERT INTO users (id, name) VALUES (1, 'Charlie')",
+        "INSERT INTO users (id, name) VALUES (3, 'Diana')"
+    ])
+    assert db.execute("SELECT id, name FROM users") == [(2, 'Alice'), (1, 'Charlie'), (3, 'Diana')]
+    assert db.execute("SELECT name FROM users WHERE id=1") == [('Charlie',)]
+    assert db.tables['users'].liveRowCount() == 3
+    db.closeAll()
+
+    reopened = SimpleDatabase(temp_db_dir)
+    assert reopened.execute("SELECT name FROM users WHERE id=3") == [('Diana',)]
+    reopened.closeAll()
+
+
+def test_simpledb_multi_row_insert(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE users (id INT, name VARCHAR(50))")
+    db.execute("CREATE INDEX ON users(id)")
+    db.execute("INSERT INTO users (id, name) VALUES (1, 'Bob'), (2, 'Alice'), (3, 'Charlie')")
+    assert db.execute("SELECT name FROM users") == [('Bob',), ('Alice',), ('Charlie',)]
+    assert db.execute("SELECT name FROM users WHERE id=2") == [('Alice',)]
+    db.closeAll()
+
+
+def test_simpledb_prepared_statements_with_placeholders(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE users (id INT, name VARCHAR(50))")
+    db.execute("CREATE INDEX ON users(id)")
+    insert = db.prepare("INSERT INTO users (id, name) VALUES (?, ?)")
+    insert.execute((1, 'Bob'))
+    insert.executeMany([(2, 'Alice'), (3, 'Charlie')])
+
+    lookup = db.prepare("SELECT name FROM users WHERE id = ?")
+    assert lookup.paramCount == 1
+    assert lookup.execute((2,)) == [('Alice',)]
+    assert db.execute("SELECT name FROM users WHERE id = ?", (3,)) == [('Charlie',)]
+    assert db.prepare("SELECT name FROM users WHERE id = ?") is lookup
+
+    with pytest.raises(ValueError):
+        lookup.execute()
+
+    db.prepare("DELETE FROM users WHERE name=?").execute(('Bob',))
+    assert db.execute("SELECT id FROM users") == [(2,), (3,)]
+    db.closeAll()
+
+
+def test_simpledb_statement_cache_is_bounded(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir, statementCacheSize=2)
+    db.execute("CREATE TABLE users (id INT, name VARCHAR(50))")
+    db.execute("INSERT INTO users (id, name) VALUES (1, 'a')")
+    db.executeMany(["INSERT INTO users (id, name) VALUES (2, 'b')", "SELECT * FROM users"])
+    assert len(db.statementCache) == 0
+    db.execute("SELECT name FROM users WHERE id = ?", (1,))
+    db.prepare("SELECT * FROM users")
+    db.prepare("SELECT id FROM users")
+    assert len(db.statementCache) == 2
+    assert "SELECT name FROM users WHERE id = ?" not in db.statementCache
+    db.closeAll()
+
+
+def test_simpledb_insert_many_rejects_bad_batch_atomically(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE users (id INT, name VARCHAR(5))")
+    eng = db.tables['users']
+    eng.insertMany([{'id': 1, 'name': 'Robert'}])
+    with pytest.raises(ValueError):
+        eng.insertMany([{'id': 2, 'name': 'Alice'}, {'id': -3, 'name': 'Bad'}])
+    eng.insertRow({'id': 4, 'name': 'Diana'})
+    assert db.execute("SELECT * FROM users") == [(1, 'Rober'), (4, 'Diana')]
+    db.closeAll()
+
+
+def test_simpledb_insert_many_accepts_generator(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE users (id INT, name VARCHAR(20))")
+    db.execute("CREATE INDEX ON users(id)")
+    eng = db.tables['users']
+    assert eng.insertMany({'id': i, 'name': 'u' + str(i)} for i in range(10)) == range(0, 10)
+    assert eng.indexes['id'].getRowIds(7) == [7]
+    assert db.execute("SELECT name FROM users WHERE id=7") == [('u7',)]
+    db.closeAll()
+
+
+def test_simpledb_int_range_select_with_and_without_index(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE plain (id INT, val INT)")
+    db.execute("CREATE TABLE indexed (id INT, val INT)")
+    db.execute("CREATE INDEX ON indexed(val)")
+    rows = [{'id': i, 'val': (i * 37) % 50} for i in range(1, 101)]
+    db.tables['plain'].insertMany(rows)
+    db.tables['indexed'].insertMany(rows)
+    db.execute("DELETE FROM indexed WHERE val=10")
+    db.execute("DELETE FROM plain WHERE val=10")
+
+    for where in [('val', '<', 10), ('val', '<=', 10), ('val', '>', 40), ('val', '>=', 40), ('val', 'between', (5, 12)), ('val', '=', 7)]:
+        expected = db.tables['plain'].select(['id'], where)
+        assert db.tables['indexed'].select(['id'], where) == expected
+        assert len(expected) > 0
+
+    index = db.tables['indexed'].indexes['val']
+    assert [key for key, _ in index.orderedItems()][:3] == [0, 1, 2]
+    db.closeAll()
+
+
+def test_simpledb_parse_where_expressions():
+    assert parseSql("SELECT * FROM t WHERE id=5")['data']['where'] == ('id', 5)
+    where = parseSql("SELECT id FROM t WHERE id > 5 AND (name = 'x' OR age BETWEEN 18 AND 30) AND city IN ('Kazan', ?)")['data']['where']
+    assert where == {'op': 'and', 'args': [
+        {'op': '>', 'col': 'id', 'value': 5},
+        {'op': 'or', 'args': [
+            {'op': '=', 'col': 'name', 'value': 'x'},
+            {'op': 'between', 'col': 'age', 'low': 18, 'high': 30}
+        ]},
+        {'op': 'in', 'col': 'city', 'values': ['Kazan', PARAM]}
+    ]}
+    cmd = parseSql("DELETE FROM t WHERE id <> 3")
+    assert cmd['type'] == 'delete_where'
+    assert cmd['data']['where'] == {'op': '!=', 'col': 'id', 'value': 3}
+    for bad in ("id = 1 AND", "id == 1", "name = 'O''Brien'"):
+        assert parseSql("SELECT * FROM t WHERE " + bad) == {'type': 'noop'}
+        assert parseSql("DELETE FROM t WHERE " + bad) == {'type': 'noop'}
+
+
+def test_simpledb_sql_predicates_with_and_without_index(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    for name in ('plain', 'indexed'):
+        db.execute(f"CREATE TABLE {name} (movie_id INT, genre VARCHAR(10))")
+    db.execute("CREATE INDEX ON indexed(movie_id)")
+    db.execute("CREATE INDEX ON indexed(genre)")
+    genres = ['drama', 'comedy', 'horror']
+    for name in ('plain', 'indexed'):
+        db.tables[name].insertMany([{'movie_id': i, 'genre': genres[i % 3]} for i in range(1, 61)])
+
+    queries = [
+        "SELECT movie_id FROM {} WHERE movie_id < 10",
+        "SELECT movie_id FROM {} WHERE movie_id >= 50 AND genre = 'drama'",
+        "SELECT movie_id FROM {} WHERE movie_id BETWEEN 20 AND 25 OR genre IN ('horror')",
+        "SELECT * FROM {} WHERE genre != 'comedy' AND movie_id <= 12",
+    ]
+    for q in queries:
+        expected = db.execute(q.format('plain'))
+        assert db.execute(q.format('indexed')) == expected
+        assert len(expected) > 0
+
+    stmt = db.prepare("SELECT movie_id FROM indexed WHERE movie_id > ? AND genre = ?")
+    assert stmt.execute((52, 'comedy')) == [(55,), (58,)]
+
+    for name in ('plain', 'indexed'):
+        db.execute(f"DELETE FROM {name} WHERE movie_id < 30 OR genre = 'horror'")
+    assert db.execute("SELECT movie_id FROM indexed WHERE movie_id < 40") == db.execute("SELECT movie_id FROM plain WHERE movie_id < 40")
+    assert db.execute("SELECT movie_id FROM indexed WHERE genre = 'horror'") == []
+    assert db.tables['indexed'].liveRowCount() == 21
+    db.closeAll()
+
+
+def test_simpledb_index_delta_log_appends_and_replays(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE users (id INT, name VARCHAR(20))")
+    db.execute("CREATE INDEX ON users(id)")
+    db.tables['users'].insertMany([{'id': i, 'name': 'u' + str(i)} for i in range(1, 501)])
+    db.closeAll()
+    indexPath = os.path.join(temp_db_dir, 'users.id.index')
+    logPath = indexPath + '.log'
+    baseSize = os.path.getsize(indexPath)
+    logSize = os.path.getsize(logPath)
+
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("INSERT INTO users (id, name) VALUES (7, 'again'), (1000, 'new')")
+    db.execute("DELETE FROM users WHERE id=3")
+    db.closeAll()
+    assert os.path.getsize(indexPath) == baseSize
+    assert 0 < os.path.getsize(logPath) - logSize < 200
+
+    with open(logPath, 'ab') as f:
+        f.write(b'\x01\x02\x03')
+    db = SimpleDatabase(temp_db_dir)
+    assert db.execute("SELECT name FROM users WHERE id=7") == [('u7',), ('again',)]
+    assert db.execute("SELECT name FROM users WHERE id=1000") == [('new',)]
+    assert db.execute("SELECT name FROM users WHERE id=3") == []
+    assert db.tables['users'].indexes['id'].getRowIds(3) == []
+    db.closeAll()
+
+
+def test_simpledb_index_log_flushed_with_data(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE users (id INT, name VARCHAR(20))")
+    db.execute("CREATE INDEX ON users(id)")
+    db.tables['users'].insertMany([{'id': i, 'name': 'u' + str(i)} for i in range(1, 101)])
+    db.closeAll()
+
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("DELETE FROM users WHERE id=5")
+    db._getEngine('users').insertMany([{'id': i, 'name': 'u' + str(i)} for i in range(101, 201)])
+
+    crashed = SimpleDatabase(temp_db_dir)
+    assert crashed.execute("SELECT COUNT(*) FROM users") == [(199,)]
+    assert crashed.execute("SELECT name FROM users WHERE id=150") == [('u150',)]
+    assert crashed.execute("SELECT COUNT(*) FROM users WHERE id=5") == [(0,)]
+    assert crashed.tables['users'].indexes['id'].getRowIds(150) != []
+    crashed.closeAll()
+
+
+def test_simpledb_index_delta_log_compacts_and_ignores_stale_log(temp_db_dir):
+    path = os.path.join(temp_db_dir, 'ints.index')
+    idx = IntIndex(path)
+    idx.add(1, 0)
+    idx.save()
+    idx.add(2, 1)
+    idx.save()
+    with open(path + '.log', 'rb') as f:
+        staleLog = f.read()
+    for rid in range(2, 5000):
+        idx.add(rid % 10, rid)
+    idx.save(False)
+    assert os.path.getsize(path + '.log') > len(staleLog)
+    assert IntIndex(path).getRowIds(7) == idx.getRowIds(7)
+    idx.save()
+    assert not os.path.exists(path + '.log')
+    with open(path + '.log', 'wb') as f:
+        f.write(staleLog)
+    reloaded = IntIndex(path)
+    assert reloaded.getRowIds(2) == idx.getRowIds(2)
+    assert sum(len(ids) for _, ids in reloaded.orderedItems()) == 5000
+
+
+def test_simpledb_index_file_format_and_legacy_upgrade(temp_db_dir):
+    path = os.path.join(temp_db_dir, 'ints.index')
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<I', 2))
+        f.write(struct.pack('<QI', 9, 2) + struct.pack('<QQ', 4, 6))
+        f.write(struct.pack('<QI', 3, 1) + struct.pack('<Q', 1))
+    legacy = IntIndex(path)
+    assert legacy.getRowIds(9) == [4, 6]
+    assert legacy.rangeRowIds(0, 10) == [1, 4, 6]
+    legacy.save()
+    with open(path, 'rb') as f:
+        assert f.read(4) == b'SDI2'
+
+    idx = IntIndex(path)
+    assert idx.map == {}
+    assert list(idx.baseKeys) == [3, 9]
+    assert idx.getRowIds(9) == [4, 6]
+    assert idx.getRowIds(5) == []
+    idx.add(5, 7)
+    idx.removeRowIds(9, {4})
+    assert idx.rangeRowIds(4, None) == [7, 6]
+    assert [key for key, _ in idx.orderedItems()] == [3, 5, 9]
+
+    strPath = os.path.join(temp_db_dir, 'names.index')
+    names = StrIndex(strPath)
+    for rid, name in enumerate(['Борис', 'alice', 'Bob', 'alice']):
+        names.add(name, rid)
+    names.save()
+    reloaded = StrIndex(strPath)
+    assert reloaded.map == {}
+    assert reloaded.getRowIds('alice') == [1, 3]
+    assert reloaded.getRowIds('Борис') == [0]
+    assert reloaded.getRowIds('Alice') == []
+
+
+def test_simpledb_like_prefix_with_and_without_string_index(temp_db_dir):
+    assert parseSql("SELECT * FROM t WHERE name LIKE 'Al%'")['data']['where'] == {'op': 'like', 'col': 'name', 'value': 'Al%'}
+    db = SimpleDatabase(temp_db_dir)
+    names = ['Alice', 'Alan', 'Bob', 'Albert', 'alex', 'Борис', 'Боря', 'Al']
+    for table, indexed in (('plain', False), ('indexed', True)):
+        db.createTable(table, [{'name': 'id', 'type': 'INT'}, {'name': 'name', 'type': 'VARCHAR', 'max': 20, 'index': indexed}])
+        db.tables[table].insertMany([{'id': i, 'name': n} for i, n in enumerate(names)])
+    db.tables['indexed']._rebuildSingleIndex('name')
+
+    queries = ["name LIKE 'Al%'", "name LIKE 'Бор%'", "name LIKE 'Al_'", "name LIKE '%e%'", "name LIKE 'Bob'", "name >= 'B'"]
+    for q in queries:
+        expected = db.execute("SELECT id FROM plain WHERE " + q)
+        assert db.execute("SELECT id FROM indexed WHERE " + q) == expected
+    assert db.execute("SELECT id FROM indexed WHERE name LIKE 'Al%'") == [(0,), (1,), (3,), (7,)]
+
+    db.execute("INSERT INTO indexed (id, name) VALUES (8, 'Alfa')")
+    assert db.execute("SELECT id FROM indexed WHERE name LIKE 'Al%'") == [(0,), (1,), (3,), (7,), (8,)]
+    assert sorted(db.tables['indexed'].indexes['name'].prefixRowIds('Бор')) == [5, 6]
+    db.closeAll()
+
+
+def test_simpledb_create_index_on_varchar_column(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE t (id INT, name VARCHAR(20))")
+    db.execute("INSERT INTO t (id, name) VALUES (1, 'Alice'), (2, 'Bob'), (3, 'Alan')")
+    db.execute("DELETE FROM t WHERE id=2")
+    db.execute("CREATE INDEX ON t (name)")
+    eng = db.tables['t']
+    assert isinstance(eng.indexes['name'], StrIndex)
+    assert eng.indexes['name'].getRowIds('Alice') == [0]
+    assert eng.indexes['name'].getRowIds('Bob') == []
+    db.execute("INSERT INTO t (id, name) VALUES (4, 'Alice')")
+    assert db.execute("SELECT id FROM t WHERE name = 'Alice'") == [(1,), (4,)]
+    db.closeAll()
+
+    db = SimpleDatabase(temp_db_dir)
+    assert db.execute("SELECT id FROM t WHERE name LIKE 'Al%'") == [(1,), (3,), (4,)]
+    assert db.tables['t'].indexes['name'].getRowIds('Alan') == [2]
+    db.closeAll()
+
+
+def test_simpledb_trigram_index_for_contains(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    names = ['Alice', 'Malice', 'Bob', 'Charlie', 'Алиса', 'Bobby', 'Lic']
+    for table in ('plain', 'tri'):
+        db.execute(f"CREATE TABLE {table} (id INT, name VARCHAR(20))")
+        db.tables[table].insertMany([{'id': i, 'name': n} for i, n in enumerate(names)])
+    db.execute("CREATE TRIGRAM INDEX ON tri(name)")
+    assert db.tables['tri'].schema.columns[1]['trigram'] is True
+
+    db.execute("INSERT INTO tri (id, name) VALUES (7, 'Felicity')")
+    db.execute("INSERT INTO plain (id, name) VALUES (7, 'Felicity')")
+    db.execute("DELETE FROM tri WHERE name = 'Malice'")
+    db.execute("DELETE FROM plain WHERE name = 'Malice'")
+    tri = db.tables['tri'].trigramIndexes['name']
+    assert tri.candidateRowIds('%lic%') == [0, 7]
+    assert tri.candidateRowIds('%li%') is None
+
+    patterns = ['%lic%', '%ob%', '%bob%', '%лис%', 'A%ce', '%ar_ie', '%zz%']
+    for pattern in patterns:
+        expected = db.execute(f"SELECT id FROM plain WHERE name LIKE '{pattern}'")
+        assert db.execute(f"SELECT id FROM tri WHERE name LIKE '{pattern}'") == expected
+    db.closeAll()
+
+    db = SimpleDatabase(temp_db_dir)
+    assert db.execute("SELECT name FROM tri WHERE name LIKE '%lic%'") == [('Alice',), ('Felicity',)]
+    assert db.tables['tri'].trigramIndexes['name'].candidateRowIds('%lic%') == [0, 7]
+    db.closeAll()
+
+
+def test_posting_list_codec_and_merges():
+    ids = [0, 1, 5, 130, 20000, 20001, 1 << 40]
+    encoded = encodePostings(ids)
+    assert len(encoded) < len(ids) * 8
+    assert decodePostings(encoded) == ids
+    assert intersectSorted([1, 3, 5, 7], [3, 4, 5]) == [3, 5]
+    assert intersectSorted([5], list(range(100))) == [5]
+    assert unionSorted([[1, 4], [2, 4, 9], []]) == [1, 2, 4, 9]
+
+
+def test_simpledb_planner_merges_sorted_posting_lists(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    for table in ('t', 'plain'):
+        db.execute("CREATE TABLE " + table + " (a INT, b INT)")
+        db.tables[table].insertMany([{'a': i % 7, 'b': i % 5} for i in range(70)])
+    db.execute("CREATE INDEX ON t (a)")
+    db.execute("CREATE INDEX ON t (b)")
+    eng = db.tables['t']
+    rows = [(i % 7, i % 5) for i in range(70)]
+    for where in ("a = 3 AND b = 1", "a IN (6, 1) OR b >= 4", "(a = 2 OR a = 5) AND b < 2", "a BETWEEN 1 AND 2 AND b = 0"):
+        pred = parseSql("SELECT a FROM t WHERE " + where)['data']['where']
+        ids, exact = eng._planRowIds(pred)
+        assert exact and isinstance(ids, list) and ids == sorted(set(ids))
+        assert [rows[rid] for rid in ids] == db.execute("SELECT a, b FROM plain WHERE " + where)
+    db.closeAll()
+
+
+def test_simpledb_fulltext_match_with_and_without_index(temp_db_dir):
+    where = parseSql("SELECT * FROM t WHERE title MATCH 'action & hero'")['data']['where']
+    assert where == {'op': 'match', 'col': 'title', 'value': 'action & hero'}
+    db = SimpleDatabase(temp_db_dir)
+    titles = ['Action Hero', 'The hero returns', 'Drama story', 'Love story, action!', 'Тёмная ночь', 'hero of action']
+    for table in ('plain', 'fts'):
+        db.execute(f"CREATE TABLE {table} (id INT, title VARCHAR(40))")
+        db.tables[table].insertMany([{'id': i, 'title': t} for i, t in enumerate(titles)])
+    db.execute("CREATE FULLTEXT INDEX ON fts(title)")
+    db.execute("DELETE FROM fts WHERE id = 5")
+    db.execute("DELETE FROM plain WHERE id = 5")
+    db.execute("INSERT INTO fts (id, title) VALUES (6, 'hero')")
+    db.execute("INSERT INTO plain (id, title) VALUES (6, 'hero')")
+
+    queries = ['hero', 'action & hero', 'story | ночь', 'ACTION hero | drama', 'missing']
+    for q in queries:
+        expected = db.execute(f"SELECT id FROM plain WHERE title MATCH '{q}'")
+        assert db.execute(f"SELECT id FROM fts WHERE title MATCH '{q}'") == expected
+    assert db.execute("SELECT id FROM fts WHERE title MATCH 'hero'") == [(0,), (1,), (6,)]
+    db.closeAll()
+
+    db = SimpleDatabase(temp_db_dir)
+    fts = db._getEngine('fts').fulltextIndexes['title']
+    assert fts.search('action & hero') == [0]
+    assert fts.search('story | тёмная') == [2, 3, 4]
+    db.closeAll()
+
+
+def test_simpledb_index_postings_are_compressed(temp_db_dir):
+    path = os.path.join(temp_db_dir, 'genre.index')
+    idx = IntIndex(path)
+    pairs = sorted((rid % 8, rid) for rid in range(20000))
+    idx.addMany(pairs)
+    idx.save()
+    assert os.path.getsize(path) * 5 < len(pairs) * 8
+    assert len(idx.basePostings.blob) * 5 < len(pairs) * 8
+
+    reloaded = IntIndex(path)
+    assert reloaded.getRowIds(3) == list(range(3, 20000, 8))
+    assert reloaded.postingCount(3) == 2500
+    assert reloaded.rangeRowIds(6, None) == list(range(6, 20000, 8)) + list(range(7, 20000, 8))
+
+
+def test_simpledb_deletes_maintain_every_index(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.createTable('movies', [
+        {'name': 'id', 'type': 'INT', 'index': True},
+        {'name': 'genre', 'type': 'VARCHAR', 'max': 10, 'index': True}
+    ])
+    eng = db.tables['movies']
+    genres = ['drama', 'comedy', 'horror', 'action']
+    eng.insertMany([{'id': i, 'genre': genres[i % 4]} for i in range(6000)])
+    eng._rebuildSingleIndex('id')
+    eng._rebuildSingleIndex('genre')
+
+    db.execute("DELETE FROM movies WHERE id < 100")
+    db.execute("DELETE FROM movies WHERE genre = 'horror'")
+    genreIndex = eng.indexes['genre']
+    idIndex = eng.indexes['id']
+    assert genreIndex.tombstoneCount == 100 + 1475
+    assert genreIndex.postingCount('drama') == 1475
+    assert genreIndex.postingCount('horror') == 0
+    assert idIndex.getRowIds(6) == []
+    assert idIndex.postingCount(107) == 1
+
+    for rid in range(100, 6000, 4):
+        eng.deleteWhere('id', rid)
+    db.execute("DELETE FROM movies WHERE genre = 'action'")
+    assert 'drama' not in genreIndex.tombstones
+    assert genreIndex.tombstoneCount < 1475
+    assert genreIndex.postingCount('drama') == 0
+    assert genreIndex.postingCount('action') == 0
+    assert genreIndex.getRowIds('comedy') == list(range(101, 6000, 4))
+    db.closeAll()
+
+    db = SimpleDatabase(temp_db_dir)
+    eng = db._getEngine('movies')
+    assert eng.indexes['genre'].postingCount('comedy') == 1475
+    assert eng.indexes['id'].rangeRowIds(0, 110) == [101, 105, 109]
+    assert db.execute("SELECT id FROM movies WHERE genre = 'comedy' AND id < 112") == [(101,), (105,), (109,)]
+    assert db.execute("SELECT id FROM movies WHERE genre = 'action'") == []
+    db.closeAll()
+
+
+def test_parse_select_join():
+    cmd = parseSql("SELECT v.id, m.title FROM viewer v JOIN fav AS fm ON v.id = fm.viewer_id inner join movie m ON fm.movie_id = m.id WHERE m.id = 3")
+    assert cmd['type'] == 'select_join'
+    d = cmd['data']
+    assert (d['table'], d['alias'], d['columns']) == ('viewer', 'v', ['v.id', 'm.title'])
+    assert d['joins'] == [
+        {'table': 'fav', 'alias': 'fm', 'left': 'v.id', 'right': 'fm.viewer_id'},
+        {'table': 'movie', 'alias': 'm', 'left': 'fm.movie_id', 'right': 'm.id'}
+    ]
+    assert d['where'] == ('m.id', 3)
+    assert parseSql("SELECT * FROM a JOIN b ON a.x")['type'] == 'noop'
+
+
+def test_simpledb_join_index_and_hash_strategies(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE viewer (viewer_id INT, name VARCHAR(20))")
+    db.execute("CREATE TABLE fav (viewer_id INT, movie_id INT)")
+    db.execute("CREATE TABLE movie (movie_id INT, title VARCHAR(30))")
+    db.execute("INSERT INTO viewer (viewer_id, name) VALUES (1, 'ann'), (2, 'bob'), (3, 'cid')")
+    db.execute("INSERT INTO fav (viewer_id, movie_id) VALUES (1, 10), (1, 11), (2, 10), (4, 11)")
+    db.execute("INSERT INTO movie (movie_id, title) VALUES (10, 'Alien'), (11, 'Heat')")
+    sql = "SELECT v.name, m.title FROM viewer v JOIN fav fm ON v.viewer_id = fm.viewer_id JOIN movie m ON m.movie_id = fm.movie_id"
+    expected = [('ann', 'Alien'), ('ann', 'Heat'), ('bob', 'Alien')]
+
+    crossTable = [
+        (" WHERE v.name = 'bob' OR m.title = 'Heat'", [('ann', 'Heat'), ('bob', 'Alien')]),
+        (" WHERE (v.viewer_id = 2 AND m.title LIKE 'Al%') OR fm.movie_id IN (11, 12)", [('ann', 'Heat'), ('bob', 'Alien')]),
+        (" WHERE v.name = 'bob' OR v.nosuch = 1", [('bob', 'Alien')]),
+        (" WHERE v.nosuch = 1", []),
+    ]
+
+    assert db.planJoin(db.prepare(sql).data).strategies == ['hash', 'hash']
+    assert db.execute(sql) == expected
+    for where, rows in crossTable:
+        assert db.execute(sql + where) == rows
+
+    db.execute("CREATE INDEX idx ON fav (viewer_id)")
+    db.execute("CREATE INDEX idx ON movie (movie_id)")
+    assert db.planJoin(db.prepare(sql).data).strategies == ['index', 'index']
+    assert db.execute(sql) == expected
+    for where, rows in crossTable:
+        assert db.execute(sql + where) == rows
+    assert db.execute("SELECT name FROM viewer WHERE name = 'bob' OR nosuch = 1") == [('bob',)]
+
+    db.execute("DELETE FROM fav WHERE movie_id = 11")
+    assert db.execute(sql + " WHERE m.title = 'Alien' AND v.viewer_id > ?", (1,)) == [('bob', 'Alien')]
+    assert db.execute("SELECT * FROM viewer JOIN fav ON viewer.viewer_id = fav.viewer_id WHERE name = 'ann'") == [(1, 'ann', 1, 10)]
+    db.closeAll()
+
+
+def test_parse_aggregates_and_group_by():
+    cmd = parseSql("SELECT genre, COUNT(*), avg(score) FROM movies WHERE id > 2 GROUP BY genre")
+    d = cmd['data']
+    assert cmd['type'] == 'select'
+    assert d['where'] == {'op': '>', 'col': 'id', 'value': 2}
+    assert d['groupBy'] == ['genre']
+    assert d['aggregates'] == [
+        {'func': None, 'col': 'genre'},
+        {'func': 'count', 'col': '*'},
+        {'func': 'avg', 'col': 'score'}
+    ]
+    assert 'aggregates' not in parseSql("SELECT id FROM movies")['data']
+    assert parseSql("SELECT v.id, COUNT(*) FROM v JOIN f ON v.id = f.id GROUP BY v.id")['data']['groupBy'] == ['v.id']
+
+
+def test_simpledb_aggregates_and_count_shortcuts(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE movies (id INT, genre VARCHAR(10), score INT)")
+    db.execute("INSERT INTO movies (id, genre, score) VALUES (1, 'drama', 5), (2, 'comedy', 7), (3, 'drama', 9), (4, 'horror', 1)")
+    assert db.execute("SELECT genre, COUNT(*), SUM(score), MIN(score), MAX(score), AVG(score) FROM movies GROUP BY genre") == [
+        ('drama', 2, 14, 5, 9, 7.0), ('comedy', 1, 7, 7, 7, 7.0), ('horror', 1, 1, 1, 1, 1.0)
+    ]
+    assert db.execute("SELECT COUNT(*), MAX(id) FROM movies WHERE id > 10") == [(0, None)]
+    assert db.execute("SELECT genre, COUNT(*) FROM movies WHERE id > 10 GROUP BY genre") == []
+    with pytest.raises(ValueError):
+        db.execute("SELECT genre, COUNT(*) FROM movies")
+
+    db.execute("CREATE INDEX idx ON movies (id)")
+    db.execute("DELETE FROM movies WHERE id = 4")
+    eng = db.tables['movies']
+
+    def noScan(pred):
+        raise AssertionError('data scanned')
+
+    eng._iterMatching = noScan
+    assert db.execute("SELECT COUNT(*) FROM movies") == [(3,)]
+    assert db.execute("SELECT COUNT(*) FROM movies WHERE id = ?", (3,)) == [(1,)]
+    assert db.execute("SELECT COUNT(id) FROM movies WHERE id IN (1, 3, 3, 4)") == [(2,)]
+    del eng._iterMatching
+
+    db.execute("CREATE TABLE fav (id INT, movie_id INT)")
+    db.execute("INSERT INTO fav (id, movie_id) VALUES (1, 10), (1, 11), (3, 12)")
+    assert db.execute("SELECT m.id, COUNT(*) FROM movies m JOIN fav f ON m.id = f.id GROUP BY m.id") == [(1, 2), (3, 1)]
+    assert db.execute("SELECT MIN(genre), MAX(genre) FROM movies") == [('comedy', 'drama')]
+    for sql in ("SELECT SUM(genre) FROM movies", "SELECT AVG(genre) FROM movies",
+                "SELECT f.id, SUM(m.genre) FROM movies m JOIN fav f ON m.id = f.id GROUP BY f.id"):
+        with pytest.raises(ValueError, match='requires an INT column'):
+            db.execute(sql)
+    db.closeAll()
+
+
+def test_parse_order_by_and_limit():
+    d = parseSql("SELECT id FROM movies WHERE score > 1 ORDER BY score DESC LIMIT 5")['data']
+    assert d['where'] == {'op': '>', 'col': 'score', 'value': 1}
+    assert d['orderBy'] == {'col': 'score', 'desc': True}
+    assert d['limit'] == 5
+    d = parseSql("SELECT genre, COUNT(*) FROM movies GROUP BY genre ORDER BY COUNT(*) LIMIT ?")['data']
+    assert d['groupBy'] == ['genre']
+    assert d['orderBy'] == {'col': 'COUNT(*)', 'desc': False}
+    assert d['limit'] is PARAM
+    assert parseSql("SELECT id FROM movies ORDER BY id sideways")['type'] == 'noop'
+
+
+def test_simpledb_clause_keywords_inside_literals(temp_db_dir):
+    d = parseSql("SELECT id FROM t WHERE name = 'a limit 5' ORDER BY id DESC LIMIT 2")['data']
+    assert d['where'] == ('name', 'a limit 5')
+    assert d['orderBy'] == {'col': 'id', 'desc': True}
+    assert d['limit'] == 2
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE t (id INT, name VARCHAR(30))")
+    db.execute("INSERT INTO t (id, name) VALUES (1, 'x order by y'), (2, 'p group by q'), (3, 'z limit 1'), (4, 'where w')")
+    assert db.execute("SELECT id FROM t WHERE name = 'x order by y'") == [(1,)]
+    assert db.execute("SELECT name, COUNT(*) FROM t WHERE name = 'p group by q' GROUP BY name") == [('p group by q', 1)]
+    assert db.execute("SELECT id FROM t WHERE name = 'z limit 1'") == [(3,)]
+    assert db.execute("SELECT id FROM t WHERE name = \"where w\"") == [(4,)]
+    db.closeAll()
+
+
+def test_simpledb_order_by_limit_heap_and_index(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE movies (id INT, genre VARCHAR(10), score INT)")
+    genres = ['drama', 'comedy', 'horror']
+    db.tables['movies'].insertMany([{'id': i, 'genre': genres[i % 3], 'score': (i * 37) % 101} for i in range(300)])
+    queries = [
+        ("SELECT id, score FROM movies ORDER BY score DESC LIMIT 3", ()),
+        ("SELECT id FROM movies WHERE genre = 'drama' ORDER BY score LIMIT ?", (2,)),
+        ("SELECT id FROM movies WHERE score < 3 ORDER BY score", ())
+    ]
+    expected = [
+        [(30, 100), (131, 100), (232, 100)],
+        [(0,), (273,)],
+        [(0,), (101,), (202,), (71,), (172,), (273,), (41,), (142,), (243,)]
+    ]
+    assert [db.execute(sql, params) for sql, params in queries] == expected
+    assert db.execute("SELECT id FROM movies LIMIT 2") == [(0,), (1,)]
+
+    db.execute("CREATE INDEX idx ON movies (score)")
+    eng = db.tables['movies']
+    assert [db.execute(sql, params) for sql, params in queries] == expected
+    seen = []
+    ordered = eng.indexes['score'].orderedItems
+
+    def trackOrdered(reverse=False):
+        for key, rowIds in ordered(reverse):
+            seen.append(key)
+            yield key, rowIds
+
+    eng.indexes['score'].orderedItems = trackOrdered
+    assert db.execute("SELECT id FROM movies ORDER BY score DESC LIMIT 2") == [(30,), (131,)]
+    assert seen == [100]
+
+    db.execute("CREATE TABLE fav (id INT, rank INT)")
+    db.execute("INSERT INTO fav (id, rank) VALUES (0, 3), (30, 1), (131, 2)")
+    assert db.execute("SELECT m.id FROM movies m JOIN fav f ON m.id = f.id ORDER BY f.rank LIMIT 2") == [(30,), (131,)]
+    assert db.execute("SELECT m.id FROM movies m JOIN fav f ON m.id = f.id LIMIT 1") == [(0,)]
+    assert db.execute("SELECT genre, MAX(score) FROM movies GROUP BY genre ORDER BY genre DESC LIMIT 2") == [('horror', 100), ('drama', 100)]
+    db.closeAll()
+
+
+def test_simpledb_cursor_streams_rows(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE movies (id INT, genre VARCHAR(10))")
+    db.tables['movies'].insertMany([{'id': i, 'genre': 'drama' if i % 2 else 'comedy'} for i in range(10)])
+
+    cur = db.cursor()
+    assert cur.execute("SELECT id FROM movies WHERE genre = ?", ('drama',)) is cur
+    assert cur.fetchone() == (1,)
+    db.execute("DELETE FROM movies WHERE id = 3")
+    assert cur.fetchmany(2) == [(5,), (7,)]
+    assert cur.fetchall() == [(9,)]
+    assert cur.fetchone() is None
+
+    cur.arraysize = 3
+    cur.execute("SELECT id FROM movies ORDER BY id DESC LIMIT 4")
+    assert cur.fetchmany() == [(9,), (8,), (7,)]
+    assert [row for row in cur] == [(6,)]
+    assert list(cur.execute("SELECT genre, COUNT(*) FROM movies GROUP BY genre")) == [('comedy', 5), ('drama', 4)]
+    assert cur.execute("INSERT INTO movies (id, genre) VALUES (10, 'horror')").fetchall() == []
+
+    with db.cursor() as other:
+        assert other.execute("SELECT COUNT(*) FROM movies").fetchone() == (10,)
+    with pytest.raises(ValueError):
+        other.fetchone()
+    db.closeAll()
+
+
+def test_simpledb_predicates_on_encoded_bytes(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE people (id INT, name VARCHAR(5), city VARCHAR(10), age INT)")
+    rows = [
+        (1, 'Ann', 'Kazan', 30), (2, 'Bob', 'Omsk', 41), (3, 'abcdé', 'Kazanka', 25),
+        (4, 'Anna', 'Tomsk', 30), (5, 'abcd', 'Kazan', 52)
+    ]
+    db.tables['people'].insertMany([{'id': r[0], 'name': r[1], 'city': r[2], 'age': r[3]} for r in rows])
+    decoder = db.tables['people'].schema.decoder
+    assert decoder.reader(3)(db.tables['people']._readRowBytes(1)) == 41
+    assert db.execute("SELECT id FROM people WHERE city = 'Kazan'") == [(1,), (5,)]
+    assert db.execute("SELECT id FROM people WHERE city != 'Kazan' AND age < 45") == [(2,), (3,), (4,)]
+    assert db.execute("SELECT id FROM people WHERE city IN ('Omsk', 'Tomsk')") == [(2,), (4,)]
+    assert db.execute("SELECT id FROM people WHERE city LIKE 'Kaz%'") == [(1,), (3,), (5,)]
+    assert db.execute("SELECT id FROM people WHERE name LIKE 'An%' AND age = 30") == [(1,), (4,)]
+    assert db.execute("SELECT name FROM people WHERE name = 'abcd'") == [('abcd',), ('abcd',)]
+    assert db.execute("SELECT id FROM people WHERE name IN ('abcd')") == [(3,), (5,)]
+    db.closeAll()
+
+
+def test_simpledb_cursor_survives_remapping(temp_db_dir):
+    db = SimpleDatabase(temp_db_dir)
+    db.execute("CREATE TABLE movies (id INT, genre VARCHAR(10))")
+    db.execute("CREATE INDEX idx ON movies (id)")
+    eng = db.tables['movies']
+    eng.insertMany([{'id': i, 'genre': 'drama'} for i in range(10)])
+
+    scan = db.cursor().execute("SELECT id FROM movies")
+    ordered = db.cursor().execute("SELECT id FROM movies ORDER BY id DESC")
+    sortedByGenre = db.cursor().execute("SELECT id FROM movies ORDER BY genre")
+    joined = db.cursor().execute("SELECT a.id FROM movies a JOIN movies b ON a.id = b.id")
+    assert scan.fetchone() == (0,)
+    assert ordered.fetchone() == (9,)
+    assert sortedByGenre.fetchone() == (0,)
+    assert joined.fetchone() == (0,)
+
+    eng.insertMany([{'id': i, 'genre': 'comedy'} for i in range(10, 20)])
+    db.execute("INSERT INTO movies (id, genre) VALUES (20, 'horror')")
+    assert db.execute("SELECT COUNT(*) FROM movies WHERE genre = 'comedy'") == [(10,)]
+    assert scan.fetchmany(2) == [(1,), (2,)]
+    assert ordered.fetchone() == (8,)
+    assert joined.fetchone() == (1,)
+
+    db.execute("DELETE FROM movies WHERE id = 3")
+    assert scan.fetchone() == (4,)
+
+    db.execute("DELETE * FROM movies")
+    assert eng.dataMap is None
+    assert db.execute("SELECT id FROM movies") == []
+    assert scan.fetchone() is None
+    assert ordered.fetchall() == []
+    assert sortedByGenre.fetchall() == []
+    assert joined.fetchall() == []
+    db.execute("INSERT INTO movies (id, genre) VALUES (30, 'drama')")
+    assert scan.fetchall() == []
+    assert db.cursor().execute("SELECT id FROM movies").fetchall() == [(30,)]
+
+    reader = eng._iterMatching(None)
+    rid, data = next(reader)
+    with pytest.raises(ValueError, match='still mapped'):
+        db.execute("DELETE * FROM movies")
+    assert db.execute("SELECT id FROM movies") == [(30,)]
+    del reader, data
+    db.execute("DELETE * FROM movies")
+    assert db.execute("SELECT id FROM movies") == []
+    db.closeAll()